@@ -3,12 +3,19 @@
 
 from drflickr.credentials import getCredentials
 from drflickr.file import readYaml
+from drflickr.rate_limiter import TokenBucket
+from drflickr.write_throttle import AdaptiveThrottle
+from drflickr.deadline import DeadlineExceeded
 
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import re
 import time
-from datetime import datetime
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from requests_oauthlib import OAuth1
 from drresult import Ok, Err, returns_result
 import logging
@@ -47,12 +54,63 @@ class ApiError(Exception):
 
 class Api:
     URL = 'https://www.flickr.com/services/rest'
-
-    def __init__(self, dry_run, api_key, access_token):
+    PER_PAGE = 500
+    STATS_PER_PAGE = 100
+    PHOTO_EXTRAS = 'count_views,count_faves,tags,date_upload,date_taken,last_update'
+    WRITE_METHODS = [
+        'photos.setDates',
+        'photos.setPerms',
+        'groups.pools.add',
+        'groups.pools.remove',
+        'photosets.addPhoto',
+        'photosets.removePhoto',
+    ]
+
+    def __init__(self, dry_run, api_key, access_token, config):
         self.dry_run = dry_run
         self.api_key = api_key
         self.access_token = access_token
         self.user_id = self.access_token['user_nsid']
+        self.config = config
+        self.adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.config['session']['pool_size'],
+            pool_block=True,
+        )
+        self.session = requests.Session()
+        self.session.headers['Connection'] = 'keep-alive'
+        self.session.mount('https://', self.adapter)
+        self.executor = ThreadPoolExecutor(max_workers=self.config['concurrency'])
+        self.deadline = None
+        self.rate_limiters = {
+            kind: TokenBucket(limit['rate'], limit['burst'])
+            for kind, limit in self.config['rate_limit'].items()
+        }
+        self.write_throttle = AdaptiveThrottle(
+            self.rate_limiters['write'], self.config['write_throttle']
+        )
+
+    def setDeadline(self, deadline):
+        self.deadline = deadline
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+        self.session.close()
+
+    def connectionStats(self):
+        num_requests = 0
+        num_connections = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool:
+                num_requests += pool.num_requests
+                num_connections += pool.num_connections
+        return {
+            'requests': num_requests,
+            'connections': num_connections,
+            'reused': num_requests - num_connections,
+        }
 
     @returns_result()
     def checkResult(self, result):
@@ -80,38 +138,134 @@ class Api:
     def call(self, method, params={}, use_user_id=True):
         assert self.auth
 
+        is_write = method in Api.WRITE_METHODS
         params_ = {'method': f'flickr.{method}', 'format': 'json', **params}
         if use_user_id:
             params_['user_id'] = self.user_id
-        response = requests.get(Api.URL, auth=self.auth, params=params_)
-        if response.status_code == 200:
-            json_str = re.sub(r'^jsonFlickrApi\((.*)\)$', r'\1', response.text)
-            data = json.loads(json_str)
-            if data['stat'] == 'ok':
-                return Ok(data)
+        retry = self.config['retry']
+        timeout = (self.config['timeout']['connect_s'], self.config['timeout']['read_s'])
+        budget_end = time.monotonic() + retry['budget_s']
+        attempt = 0
+        while True:
+            if not is_write and self.deadline and self.deadline.expired():
+                return Err(DeadlineExceeded())
+            self.rate_limiters['write' if is_write else 'read'].acquire()
+            retry_after = None
+            start = time.monotonic()
+            try:
+                response = self.session.get(
+                    Api.URL, auth=self.auth, params=params_, timeout=timeout
+                )
+            except (
+                requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout,
+            ) as e:
+                error = NetworkError(e)
+                if is_write:
+                    # a write may have gone through, leave it to the greylist
+                    self.write_throttle.record(False, time.monotonic() - start)
+                    return Err(error)
             else:
-                return Err(ApiError(data))
-        else:
-            return Err(NetworkError(response))
+                if is_write:
+                    self.write_throttle.record(
+                        response.status_code == 200, time.monotonic() - start
+                    )
+                if response.status_code == 200:
+                    json_str = re.sub(r'^jsonFlickrApi\((.*)\)$', r'\1', response.text)
+                    data = json.loads(json_str)
+                    if data['stat'] == 'ok':
+                        return Ok(data)
+                    else:
+                        return Err(ApiError(data))
+                error = NetworkError(response)
+                if is_write or not (
+                    response.status_code == 429 or response.status_code >= 500
+                ):
+                    return Err(error)
+                retry_after = self.parseRetryAfter(response)
+
+            attempt += 1
+            delay = self.backoff(attempt, retry_after)
+            if (
+                attempt >= retry['max_attempts']
+                or time.monotonic() + delay > budget_end
+                or (self.deadline and delay > self.deadline.remaining())
+            ):
+                logger.warning(f'{method}: giving up after {attempt} attempts: {error}')
+                return Err(error)
+            logger.warning(f'{method}: {error}, retrying in {delay:.1f}s')
+            time.sleep(delay)
+
+    def backoff(self, attempt, retry_after=None):
+        retry = self.config['retry']
+        delay = random.uniform(
+            0, min(retry['max_delay_ms'], retry['base_delay_ms'] * 2 ** (attempt - 1))
+        ) / 1000.0
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def parseRetryAfter(self, response):
+        retry_after = response.headers.get('Retry-After')
+        if retry_after is None:
+            return None
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        try:
+            return max(
+                0.0,
+                (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds(),
+            )
+        except (TypeError, ValueError):
+            return None
+
+    @returns_result()
+    def runConcurrently(self, function, args_list):
+        futures = [self.executor.submit(function, *args) for args in args_list]
+        results = []
+        for future in futures:
+            result = future.result()
+            if result.is_err():
+                for pending in futures:
+                    pending.cancel()
+                return result
+            results.append(result.unwrap())
+        return Ok(results)
+
+    def collectConcurrently(self, function, args_list):
+        futures = [self.executor.submit(function, *args) for args in args_list]
+        return [future.result() for future in futures]
+
+    @returns_result()
+    def callConcurrently(self, method, params_list):
+        return self.runConcurrently(
+            self.call, [(method, params) for params in params_list]
+        )
 
     @returns_result()
     def getPhotos(self, sort='interestingness-desc'):
-        page = 1
-        pages = 1
-        photos = []
-        while page <= pages:
-            result = self.call(
-                'photos.search',
-                {
-                    'extras': 'count_views, count_faves, tags, date_upload, date_taken',
-                    'sort': sort,
-                    'page': page,
-                },
-                use_user_id=True,
-            ).unwrap_or_return()
-            photos += result['photos']['photo']
-            page += 1
-            pages = result['photos']['pages']
+        params = {
+            'extras': Api.PHOTO_EXTRAS,
+            'sort': sort,
+            'per_page': Api.PER_PAGE,
+        }
+        first_page = self.call(
+            'photos.search', {**params, 'page': 1}
+        ).unwrap_or_return()
+        other_pages = self.callConcurrently(
+            'photos.search',
+            [
+                {**params, 'page': page}
+                for page in range(2, int(first_page['photos']['pages']) + 1)
+            ],
+        ).unwrap_or_return()
+        photos = [
+            photo
+            for result in [first_page] + other_pages
+            for photo in result['photos']['photo']
+        ]
         photos = [
             {
                 'title': photo['title'],
@@ -126,22 +280,40 @@ class Api:
                     ).timestamp()
                 ),
                 'is_public': bool(photo['ispublic']),
+                'last_update': int(photo['lastupdate']),
             }
             for photo in photos
         ]
-        for photo in photos:
-            contexts = self.call('photos.getAllContexts', {'photo_id': photo['id']}).unwrap_or_return()
-            photo['groups'] = [pool['id'] for pool in contexts.get('pool', [])]
         photos = {photo['id']: photo for photo in photos}
         return Ok(photos)
 
+    @returns_result()
+    def getPhotoGroups(self, photo_id):
+        context = self.call(
+            'photos.getAllContexts', {'photo_id': photo_id}
+        ).unwrap_or_return()
+        return Ok([pool['id'] for pool in context.get('pool', [])])
+
     @returns_result()
     def getPhotoset(self, photoset_id):
-        photoset = self.call(
-            'photosets.getPhotos', {'photoset_id': photoset_id}
+        params = {'photoset_id': photoset_id, 'per_page': Api.PER_PAGE}
+        first_page = self.call(
+            'photosets.getPhotos', {**params, 'page': 1}
         ).unwrap_or_return()
-        photoset = photoset['photoset']['photo']
-        return Ok([photo['id'] for photo in photoset])
+        other_pages = self.callConcurrently(
+            'photosets.getPhotos',
+            [
+                {**params, 'page': page}
+                for page in range(2, int(first_page['photoset']['pages']) + 1)
+            ],
+        ).unwrap_or_return()
+        return Ok(
+            [
+                photo['id']
+                for result in [first_page] + other_pages
+                for photo in result['photoset']['photo']
+            ]
+        )
 
     @returns_result()
     def updatePhotoDates(self, photo):
@@ -175,8 +347,31 @@ class Api:
         }
         if 'remaining' in group['throttle']:
             group['throttle']['remaining'] = int(group['throttle']['remaining'])
+        if 'count' in group['throttle']:
+            group['throttle']['count'] = int(group['throttle']['count'])
         return Ok(group)
 
+    @returns_result()
+    def getUserGroups(self):
+        groups = self.call(
+            'people.getGroups', {'extras': 'privacy,throttle,restrictions'}
+        ).unwrap_or_return()
+        return Ok(
+            {
+                group['nsid']: {
+                    'name': group['name'],
+                    'members': int(group['members']),
+                    'ispoolmoderated': bool(int(group['pool_moderated'])),
+                    'invitation_only': bool(int(group['invitation_only'])),
+                }
+                for group in groups['groups']['group']
+                if all(
+                    key in group
+                    for key in ['name', 'members', 'pool_moderated', 'invitation_only']
+                )
+            }
+        )
+
     @returns_result()
     def publishPhoto(self, photo):
         if not self.dry_run:
@@ -197,7 +392,11 @@ class Api:
     def getPhotosets(self):
         photosets = self.call('photosets.getList', {}).unwrap_or_return()
         photosets = {
-            photoset['title']['_content']: photoset['id']
+            photoset['title']['_content']: {
+                'id': photoset['id'],
+                'count': int(photoset['photos']) + int(photoset['videos']),
+                'date_update': int(photoset['date_update']),
+            }
             for photoset in photosets['photosets']['photoset']
         }
         return Ok(photosets)
@@ -253,4 +452,28 @@ class Api:
             else:
                 return Err(result)
         else:
-            return result.unwrap()['stats']['total']['views']
+            return Ok(int(result.unwrap()['stats']['total']['views']))
+
+    @returns_result()
+    def getPopularPhotos(self, date):
+        params = {'date': date, 'sort': 'views', 'per_page': Api.STATS_PER_PAGE}
+        first_page = self.call(
+            'stats.getPopularPhotos', {**params, 'page': 1}
+        ).unwrap_or_return()
+        other_pages = self.callConcurrently(
+            'stats.getPopularPhotos',
+            [
+                {**params, 'page': page}
+                for page in range(2, int(first_page['photos']['pages']) + 1)
+            ],
+        ).unwrap_or_return()
+        return Ok(
+            {
+                photo['id']: {
+                    'views': int(photo['stats']['views']),
+                    'faves': int(photo['stats']['favorites']),
+                }
+                for result in [first_page] + other_pages
+                for photo in result['photos']['photo']
+            }
+        )
@@ -5,13 +5,13 @@ from drflickr.applicator_greylist import ApplicatorGreylist
 from drflickr.photoset import getPhotosetAsOrderedList
 from drflickr.api import ApiError, NetworkError
 from drflickr.group_info import GroupInfo
+from drflickr.task_graph import TaskGraph
 
 from drresult import Ok, Err, returns_result
 from collections import namedtuple
 import json
-import time
+import threading
 import logging
-import random
 
 logger = logging.getLogger(__name__)
 
@@ -25,38 +25,122 @@ class Applicator:
         "addPhotoToSet",
         "removePhotoFromSet",
     ]
+    # lower runs first, so whatever a cycle deadline cuts off is least important;
+    # dates before publish keeps the reconciler's order for a new photo
+    priorities = {
+        "updatePhotoDates": 0,
+        "publishPhoto": 1,
+        "removePhotoFromGroup": 2,
+        "addPhotoToGroup": 3,
+        "addPhotoToSet": 4,
+        "removePhotoFromSet": 5,
+    }
 
-    def __init__(self, api, submissions, group_info, config):
+    def __init__(self, api, submissions, context_cache, journal, config):
         self.api = api
         self.submissions = submissions
-        self.group_info = GroupInfo(group_info)
+        self.context_cache = context_cache
+        self.journal = journal
         self.config = config
+        self.lock = threading.Lock()
 
-    def __call__(self, operations, photosets, greylist):
-        self.photosets = photosets
+    def resume(self, greylist, group_info, deadline):
+        plan = self.journal.interrupted()
+        logger.info(
+            f'resuming interrupted run: {len(plan.completed)} operations done, '
+            f'{len(plan.operations)} left'
+        )
         greylist = ApplicatorGreylist(
             json.loads(json.dumps(greylist)), self.config["greylist"]
         )
-        applied = []
-        for op in operations:
-            if op["method"] in Applicator.methods:
-                if not op in greylist:
-                    result = getattr(self, op["method"])(*op["params"])
-                    greylist.update(op, result)
-                    applied.append(result.is_ok())
-                    time.sleep(
-                        random.uniform(
-                            self.config['throttle']['min_ms'],
-                            self.config['throttle']['max_ms'],
-                        )
-                        / 1000.0
-                    )
+        for op, error in plan.completed:
+            greylist.update(op, Ok(None) if error is None else Err(Exception(error)))
+        return self(
+            plan.operations,
+            plan.photosets,
+            greylist.to_dict(),
+            group_info,
+            deadline,
+            resumed=True,
+        )
+
+    def __call__(self, operations, photosets, greylist, group_info, deadline, resumed=False):
+        self.photosets = photosets
+        self.group_info = GroupInfo(group_info)
+        self.greylist = ApplicatorGreylist(
+            json.loads(json.dumps(greylist)), self.config["greylist"]
+        )
+        operations = sorted(
+            (
+                op
+                for op in operations
+                if op["method"] in Applicator.methods and not op in self.greylist
+            ),
+            key=self.priority,
+        )
+        self.journal.begin(operations, photosets, resumed)
+        graph = TaskGraph('applicator', max_workers=self.config['concurrency'])
+        for index, dependencies in enumerate(Applicator.orderingDependencies(operations)):
+            graph.add(
+                index,
+                lambda *_, index=index: self.applyOperation(
+                    index, operations[index], deadline
+                ),
+                dependencies,
+                priority=index,
+            )
+        applied = list(graph().unwrap().values())
+        self.journal.end()
+        if not all(applied):
+            logger.warning(f'{applied.count(False)} operations not applied')
         return namedtuple("ApplicatorResult", ["result", "greylist"])(
-            all(applied), greylist.to_dict()
+            all(applied), self.greylist.to_dict()
         )
 
+    def priority(self, op):
+        scarcity = 0
+        if op["method"] == "addPhotoToGroup":
+            # groups with the least quota left first, unthrottled groups last
+            remaining = self.group_info.getRemaining(op["params"][1])
+            scarcity = remaining if remaining is not None else float('inf')
+        return (Applicator.priorities[op["method"]], scarcity)
+
+    @staticmethod
+    def orderingKeys(op):
+        keys = [('photo', op["params"][0]['id'])]
+        if op["method"] in ["addPhotoToGroup", "removePhotoFromGroup"]:
+            keys.append(('group', op["params"][1]))
+        elif op["method"] in ["addPhotoToSet", "removePhotoFromSet"]:
+            keys.append(('set', op["params"][1]))
+        return keys
+
+    @staticmethod
+    def orderingDependencies(operations):
+        # each operation waits for the previous one on the same photo and
+        # on the same group or set, independent chains run concurrently
+        last = {}
+        dependencies = []
+        for index, op in enumerate(operations):
+            keys = Applicator.orderingKeys(op)
+            dependencies.append(sorted(set(last[key] for key in keys if key in last)))
+            for key in keys:
+                last[key] = index
+        return dependencies
+
+    @returns_result()
+    def applyOperation(self, index, op, deadline):
+        if deadline.expired():
+            logger.warning(f'cycle deadline exceeded: leaving {op["method"]} for next cycle')
+            return Ok(False)
+        result = getattr(self, op["method"])(*op["params"])
+        with self.lock:
+            self.greylist.update(op, result)
+        self.journal.done(index, None if result.is_ok() else str(result.unwrap_err()))
+        return Ok(result.is_ok())
+
     def addPhotoToGroup(self, photo, group_id):
         logger.info(f'Adding photo {photo["title"]} to group {group_id}')
+        self.context_cache.invalidate(photo['id'])
         result = self.api.addPhotoToGroup(photo, group_id)
         if result.is_ok():
             # photo was added successfully
@@ -79,6 +163,7 @@ class Applicator:
                     logger.warning(
                         f'group {self.group_info.getName(group_id)} photo limit hit'
                     )
+                    self.group_info.recordPhotoLimit(group_id)
                     return Err(result)
                 elif (result.code == 6) or (result.code == 7):
                     # photo already in pending
@@ -106,6 +191,7 @@ class Applicator:
 
     def removePhotoFromGroup(self, photo, group_id):
         logger.info(f'Removing photo {photo["title"]} from group {group_id}')
+        self.context_cache.invalidate(photo['id'])
         result = self.api.removePhotoFromGroup(photo, group_id)
         if result.is_ok():
             return self.submissions.remove(photo, group_id)
@@ -115,7 +201,8 @@ class Applicator:
                 if result.code == 2:
                     # Photo already removed from pool
                     return self.submissions.remove(photo, group_id)
-        return result
+            return Err(result)
+        return Err(result)
 
     def publishPhoto(self, photo):
         logger.info(f'Publishing new photo: {photo["title"]}')
@@ -5,6 +5,7 @@ from drflickr.cli.path_options import creds_path_option
 from drflickr.credentials import getCredentials
 from drflickr.file import readYaml, writeYaml
 from drflickr.api import Api
+from drflickr.config_defaults import config_defaults
 from drresult import Ok, Err, returns_result
 
 import json
@@ -114,7 +115,12 @@ def _test(creds_path):
         os.path.join(creds_path, 'access-token.yaml')
     ).unwrap_or_return()
     api = (
-        Api(dry_run=True, api_key=api_key, access_token=access_token)
+        Api(
+            dry_run=True,
+            api_key=api_key,
+            access_token=access_token,
+            config=config_defaults['api'],
+        )
         .load()
         .unwrap_or_return()
     )
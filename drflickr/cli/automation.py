@@ -52,7 +52,7 @@ def signal_handler(signum, frame, exit_flag):
         sys.exit(1)
 
 
-def run(dry_run, debug_dry_run, config_path, run_path, creds_path):
+def load(dry_run, debug_dry_run, config_path, run_path, creds_path):
     runner = Runner(
         config_path=config_path,
         run_path=run_path,
@@ -60,31 +60,41 @@ def run(dry_run, debug_dry_run, config_path, run_path, creds_path):
         dry_run=dry_run,
         debug_dry_run=debug_dry_run,
     ).load()
-    if runner:
-        runner = runner.unwrap()
-        result = runner()
-        if result:
-            logging.info(f'Runner succeeded. Fully reconciled: {result.unwrap()}')
-        else:
-            logging.critical(
-                f'Runner failed: {"".join(traceback.format_exception(result.unwrap_err()))}'
-            )
-        return result
-    else:
+    if not runner:
         logging.critical(
             f'Cannot load runner: {"".join(traceback.format_exception(runner.unwrap_err()))}'
         )
-        return runner
+    return runner
 
 
-def loop(singleshot, interval, exit_flag, dry_run, debug_dry_run, config_path, run_path, creds_path):
+def run(runner):
+    result = runner()
+    if result:
+        logging.info(f'Runner succeeded. Fully reconciled: {result.unwrap()}')
+    else:
+        logging.critical(
+            f'Runner failed: {"".join(traceback.format_exception(result.unwrap_err()))}'
+        )
+    return result
+
+
+def loop(singleshot, interval, exit_flag, keep_runner, dry_run, debug_dry_run, config_path, run_path, creds_path):
     logging.info('Startup')
     signal.signal(signal.SIGTERM, lambda s, f: signal_handler(s, f, exit_flag))
     signal.signal(signal.SIGINT, lambda s, f: signal_handler(s, f, exit_flag))
 
     num_api_failures = 0
+    runner = None
     while not exit_flag['flag']:
-        result = run(dry_run, debug_dry_run, config_path, run_path, creds_path)
+        if not runner:
+            result = load(dry_run, debug_dry_run, config_path, run_path, creds_path)
+            if result:
+                runner = result.unwrap()
+        if runner:
+            result = run(runner)
+            if not result or not keep_runner:
+                runner.close()
+                runner = None
         if singleshot:
             break
         if not result:
@@ -107,6 +117,8 @@ def loop(singleshot, interval, exit_flag, dry_run, debug_dry_run, config_path, r
             time.sleep(1)
             total_sleep += 1
 
+    if runner:
+        runner.close()
     logging.info('Exit')
 
 
@@ -134,10 +146,15 @@ def automation():
 @click.option(
     '--singleshot/--no-singleshot', default=False, help='Runs once then exits.'
 )
+@click.option(
+    '--keep-runner/--no-keep-runner',
+    default=True,
+    help='Keep session, stores and config loaded between executions.',
+)
 @config_path_option
 @run_path_option
 @creds_path_option
-def start(daemon, logfile, interval, dry_run, debug_dry_run, config_path, run_path, creds_path, loglevel, singleshot):
+def start(daemon, logfile, interval, dry_run, debug_dry_run, config_path, run_path, creds_path, loglevel, singleshot, keep_runner):
     if os.path.exists(pidfile_path):
         try:
             with open(pidfile_path, 'r') as f:
@@ -175,7 +192,7 @@ def start(daemon, logfile, interval, dry_run, debug_dry_run, config_path, run_pa
             working_directory='./',
         ) as context:
             with log_panic(logger):
-                loop(singleshot, interval, exit_flag, dry_run, debug_dry_run, config_path, run_path, creds_path)
+                loop(singleshot, interval, exit_flag, keep_runner, dry_run, debug_dry_run, config_path, run_path, creds_path)
     else:
         logger = create_logger(logfile, loglevel)
 
@@ -184,7 +201,7 @@ def start(daemon, logfile, interval, dry_run, debug_dry_run, config_path, run_pa
 
         try:
             with log_panic(logger):
-                loop(singleshot, interval, exit_flag, dry_run, debug_dry_run, config_path, run_path, creds_path)
+                loop(singleshot, interval, exit_flag, keep_runner, dry_run, debug_dry_run, config_path, run_path, creds_path)
         finally:
             if os.path.exists(pidfile_path):
                 os.remove(pidfile_path)
@@ -0,0 +1,104 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+from drflickr.file import readYaml
+
+from drresult import Ok, Err, returns_result
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# settings added after the first release; a config.yaml written before them
+# keeps working and only needs to list what it wants to change
+config_defaults = {
+    'logic': {
+        'group_checker': {
+            'max_pools': 60,
+        },
+    },
+    'applicator': {
+        'concurrency': 4,
+        'journal': {
+            'fsync_every': 20,
+            'fsync_interval_s': 5,
+        },
+    },
+    'api': {
+        'session': {
+            'pool_size': 10,
+        },
+        'concurrency': 8,
+        # Flickr allows 3600 calls per hour per key, shared by reads and
+        # writes, so read rate plus the write throttle's max_rate stays <= 1/s
+        'rate_limit': {
+            'read': {
+                'rate': 0.75,
+                'burst': 5,
+            },
+            'write': {
+                'rate': 0.2,
+                'burst': 1,
+            },
+        },
+        'retry': {
+            'max_attempts': 5,
+            'base_delay_ms': 500,
+            'max_delay_ms': 30000,
+            'budget_s': 120,
+        },
+        'timeout': {
+            'connect_s': 10,
+            'read_s': 60,
+        },
+        'write_throttle': {
+            'min_rate': 0.05,
+            'max_rate': 0.25,
+            'increase': 0.01,
+            'decrease': 0.5,
+            'latency_s': 5,
+        },
+    },
+    'retriever': {
+        'album_scoped': True,
+        'full_sync_hours': 24,
+        'photoset_concurrency': 4,
+        'context_cache': {
+            'ttl_hours': 72,
+            'stagger': 0.5,
+        },
+    },
+    'runner': {
+        'cycle_budget_minutes': 60,
+    },
+    'submissions': {
+        'compact_records': 1000,
+    },
+    'photo_stats': {
+        'enabled': False,
+        'retention_days': 28,
+    },
+    'group_info': {
+        'ttl_hours': {
+            'static': 168,
+            'throttle': 24,
+            'throttle_moderated': 1,
+        },
+    },
+}
+
+
+def withDefaults(config, defaults=config_defaults):
+    merged = json.loads(json.dumps(defaults))
+    for key, value in config.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = withDefaults(value, merged[key])
+        else:
+            merged[key] = value
+    return merged
+
+
+@returns_result()
+def readConfig(filename):
+    return Ok(withDefaults(readYaml(filename).unwrap_or_return()))
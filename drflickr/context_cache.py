@@ -0,0 +1,50 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import random
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ContextCache:
+    def __init__(self, store, config):
+        self.store = store
+        self.config = config
+        self.store.content.setdefault('photos', {})
+        self.hits = 0
+        self.misses = 0
+
+    def transaction(self):
+        return self.store.transaction()
+
+    def resetCounters(self):
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, photo_id):
+        entry = self.store.content['photos'].get(photo_id)
+        if entry and entry['expires'] > time.time():
+            self.hits += 1
+            return entry['groups']
+        self.misses += 1
+        return None
+
+    def put(self, photo_id, groups):
+        ttl = self.config['ttl_hours'] * 60 * 60
+        self.store.content['photos'][photo_id] = {
+            'groups': groups,
+            'expires': time.time() + ttl * random.uniform(1 - self.config['stagger'], 1),
+        }
+
+    def invalidate(self, photo_id):
+        self.store.content['photos'].pop(photo_id, None)
+
+    def retain(self, photo_ids):
+        photo_ids = set(photo_ids)
+        self.store.content['photos'] = {
+            id: entry
+            for id, entry in self.store.content['photos'].items()
+            if id in photo_ids
+        }
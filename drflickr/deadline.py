@@ -0,0 +1,29 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineExceeded(Exception):
+    def isNetworkError(self):
+        return False
+
+    def isApiError(self):
+        return False
+
+    def __str__(self):
+        return 'cycle deadline exceeded'
+
+
+class Deadline:
+    def __init__(self, seconds):
+        self.end = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.end - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
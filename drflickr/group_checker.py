@@ -17,11 +17,12 @@ class GroupChecker:
         self.config = config
         self.group_selector = GroupSelector(self.config['selector'])
 
-    def __call__(self, photo, greylist, group_info, blacklist):
+    def __call__(self, photo, greylist, group_info, blacklist, pool_count=0):
         self.photo = photo
         self.greylist = greylist
         self.group_info = group_info
         self.blacklist = blacklist
+        self.pool_count = pool_count
 
         self.purgeGroups()
         if not self.greylist.has('photo', self.photo['id']):
@@ -68,8 +69,14 @@ class GroupChecker:
         ]
         logger.debug(f'self.photo["groups"] after purge: {self.photo["groups"]}')
 
+    def isAtPoolCap(self):
+        return self.pool_count >= self.config['max_pools']
+
     def checkTagGroups(self):
         logger.info(f'Checking photo for groups {self.photo["title"]} {self.photo["id"]}')
+        if self.isAtPoolCap():
+            logger.info(f'{self.photo["title"]} is in {self.pool_count} pools, at cap')
+            return
         eligible_groups = [
             group
             for group in self.target_groups
@@ -84,12 +91,14 @@ class GroupChecker:
             eligible_groups,
             self.group_info,
         )
+        selected_groups = selected_groups[: self.config['max_pools'] - self.pool_count]
         logger.debug(f'selected_groups: {selected_groups}')
         if selected_groups:
             for group in selected_groups:
                 self.greylist.add('group', group['id'], 'photo_added')
                 self.group_info.reduceRemaining(group['id'])
                 self.photo['groups'].append(group['id'])
+                self.pool_count += 1
             self.greylist.add('photo', self.photo['id'], 'added_to_group')
 
     def checkStatGroups(self):
@@ -107,8 +116,12 @@ class GroupChecker:
                         logger.debug(f'checking {self.photo} against {group}')
                         if self.photo[stat] >= group['ge'] and self.photo[stat] < group['less']:
                             if group['nsid'] not in self.photo['groups']:
-                                logger.info(f'should be in {group["name"]}, adding')
-                                self.photo['groups'].append(group['nsid'])
+                                if self.isAtPoolCap():
+                                    logger.info(f'should be in {group["name"]}, but at pool cap')
+                                else:
+                                    logger.info(f'should be in {group["name"]}, adding')
+                                    self.photo['groups'].append(group['nsid'])
+                                    self.pool_count += 1
                         elif group['nsid'] in self.photo['groups']:
                             logger.info(f'should not be in {group["name"]}, removing')
                             self.photo['groups'].remove(group['nsid'])
@@ -2,6 +2,7 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import logging
+import time
 
 from drresult import noexcept
 
@@ -9,6 +10,12 @@ logger = logging.getLogger(__name__)
 
 
 class GroupInfo:
+    throttle_periods = {
+        'day': 24 * 60 * 60,
+        'week': 7 * 24 * 60 * 60,
+        'month': 30 * 24 * 60 * 60,
+    }
+
     def __init__(self, group_info):
         self.group_info = group_info
 
@@ -18,19 +25,51 @@ class GroupInfo:
 
     @noexcept
     def getName(self, group_id):
+        if group_id not in self.group_info:
+            return group_id
         return self.group_info[group_id]['name']
 
+    @noexcept
+    def getRemaining(self, group_id):
+        if group_id not in self.group_info:
+            return None
+        group = self.group_info[group_id]
+        if 'throttle' not in group or 'remaining' not in group['throttle']:
+            return None
+        if group['throttle'].get('mode') == 'none':
+            return None
+        reset = group.get('throttle_reset')
+        if reset is not None and reset <= time.time():
+            return int(group['throttle'].get('count', 1))
+        return group['throttle']['remaining']
+
     @noexcept
     def hasPhotoLimit(self, group_id):
+        remaining = self.getRemaining(group_id)
+        return remaining is not None and remaining <= 0
+
+    @noexcept
+    def predictReset(self, group_id):
         group = self.group_info[group_id]
-        return (
-            'throttle' in group
-            and 'remaining' in group['throttle']
-            and group['throttle']['remaining'] <= 0
-        )
+        period = GroupInfo.throttle_periods.get(group['throttle'].get('mode'))
+        group['throttle_reset'] = time.time() + period if period else None
 
     @noexcept
     def reduceRemaining(self, group_id):
+        remaining = self.getRemaining(group_id)
+        if remaining is not None:
+            group = self.group_info[group_id]
+            group['throttle']['remaining'] = remaining - 1
+            group.pop('throttle_reset', None)
+            if group['throttle']['remaining'] <= 0:
+                self.predictReset(group_id)
+
+    @noexcept
+    def recordPhotoLimit(self, group_id):
+        if group_id not in self.group_info:
+            return
         group = self.group_info[group_id]
-        if 'throttle' in group and 'remaining' in group['throttle']:
-            group['throttle']['remaining'] -= 1
+        group.setdefault('throttle', {})
+        group['throttle']['remaining'] = 0
+        self.predictReset(group_id)
+        logger.info(f'group {group["name"]} at photo limit, reset: {group["throttle_reset"]}')
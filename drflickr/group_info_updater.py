@@ -8,25 +8,98 @@ from typing import List
 
 from drresult import noexcept
 
+from drflickr.group_info import GroupInfo
+
 logger = logging.getLogger(__name__)
 
 
 class GroupInfoUpdater:
-    def __init__(self, api):
+    def __init__(self, api, config):
         self.api = api
+        self.config = config
 
     @noexcept
-    def __call__(self, group_info: dict, group_list: List[str]) -> dict:
+    def __call__(
+        self,
+        group_info: dict,
+        group_list: List[str],
+        candidate_groups: List[str],
+        retained_groups: List[str],
+    ) -> dict:
         group_info = dict(group_info)
         for group_id in [g for g in group_list if g not in group_info]:
             group_info[group_id] = {'name': group_id, 'last_update': 0}
-        for group_id in group_info:
-            if (group_info[group_id]['last_update'] + 24 * 60 * 60) < time.time() or group_info[group_id]['ispoolmoderated']:
-                logger.debug(f'updating info on group: {group_info[group_id]["name"] if "name" in group_info[group_id] else group_id}')
-                result = self.api.getGroupInfo(group_id)
-                if result:
-                    group_info[group_id] = {
-                        **result.unwrap(),
-                        'last_update': time.time(),
-                    }
+
+        evicted = [
+            group_id
+            for group_id in group_info
+            if group_id not in group_list and group_id not in retained_groups
+        ]
+        for group_id in evicted:
+            logger.info(f'evicting info on unconfigured group: {group_info[group_id]["name"]}')
+            del group_info[group_id]
+
+        static_stale = [
+            group_id
+            for group_id in group_info
+            if self.isStaticStale(group_info[group_id])
+        ]
+        if static_stale:
+            self.bootstrap(group_info, static_stale)
+
+        to_update = [
+            group_id
+            for group_id in group_info
+            if self.isStaticStale(group_info[group_id])
+            or (
+                group_id in candidate_groups
+                and self.isThrottleStale(group_info[group_id])
+            )
+        ]
+        logger.info(f'updating info on {len(to_update)} of {len(group_info)} groups')
+        results = self.api.collectConcurrently(
+            self.api.getGroupInfo, [(group_id,) for group_id in to_update]
+        )
+        now = time.time()
+        for group_id, result in zip(to_update, results):
+            if result:
+                group_info[group_id] = {
+                    **result.unwrap(),
+                    'last_update': now,
+                    'throttle_update': now,
+                }
+                if GroupInfo(group_info).hasPhotoLimit(group_id):
+                    GroupInfo(group_info).predictReset(group_id)
+            else:
+                logger.debug(f'updating info on group {group_id}: {result.unwrap_err()}')
         return group_info
+
+    def bootstrap(self, group_info, group_ids):
+        result = self.api.getUserGroups()
+        if not result:
+            logger.warning(f'cannot list user groups: {result.unwrap_err()}')
+            return
+        user_groups = result.unwrap()
+        now = time.time()
+        bootstrapped = [group_id for group_id in group_ids if group_id in user_groups]
+        logger.info(f'bootstrapped info on {len(bootstrapped)} groups from group listing')
+        for group_id in bootstrapped:
+            group_info[group_id] = {
+                **group_info[group_id],
+                **user_groups[group_id],
+                'last_update': now,
+            }
+
+    def isStaticStale(self, group):
+        return (
+            group['last_update'] + self.config['ttl_hours']['static'] * 60 * 60
+        ) < time.time()
+
+    def isThrottleStale(self, group):
+        ttl_hours = self.config['ttl_hours']
+        throttle_ttl = (
+            ttl_hours['throttle_moderated']
+            if group.get('ispoolmoderated', False)
+            else ttl_hours['throttle']
+        )
+        return (group.get('throttle_update', 0) + throttle_ttl * 60 * 60) < time.time()
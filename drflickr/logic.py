@@ -34,7 +34,8 @@ class Logic:
         self.reorderer = Reorderer(config['reorderer'])
         self.reconciler = Reconciler()
 
-    def __call__(self, photos_actual, photos_expected, greylist, group_info, photo_info, blacklist):
+    def __call__(self, photos_actual, photos_expected, greylist, group_info, photo_info, blacklist, pool_counts=None):
+        pool_counts = pool_counts or {}
         photos_expected = json.loads(json.dumps(photos_expected))
         greylist = Greylist(json.loads(json.dumps(greylist)), self.config['greylist'])
         group_info = GroupInfo(json.loads(json.dumps(group_info)))
@@ -95,7 +96,13 @@ class Logic:
             if photo['is_public']
         }
         for photo in photos_expected_public.values():
-            self.group_checker(photo, greylist, group_info, blacklist)
+            self.group_checker(
+                photo,
+                greylist,
+                group_info,
+                blacklist,
+                self.getPoolCount(photos_actual[photo['id']], photo, pool_counts),
+            )
         self.publisher(photos_expected.values(), greylist)
         if self.config['reorderer']['enabled'] and not greylist.has(
             'ordering', 'photos_ordered'
@@ -108,3 +115,8 @@ class Logic:
         return namedtuple(
             'LogicResult', ['photos_expected', 'greylist', 'group_info', 'operations', 'photo_info']
         )(photos_expected, greylist.greylist, group_info.group_info, operations, photo_info)
+
+    def getPoolCount(self, photo_actual, photo_expected, pool_counts):
+        # pools the photo is in now plus adds planned in earlier cycles not applied yet
+        pending = set(photo_expected['groups']).difference(photo_actual['groups'])
+        return pool_counts.get(photo_actual['id'], 0) + len(pending)
@@ -0,0 +1,74 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import math
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MetricSeries:
+    def __init__(self, state):
+        self.state = state
+
+    @staticmethod
+    def initialState(period, retention):
+        return {
+            'period': period,
+            'retention': retention,
+            'count': 0,
+            'mean': 0.0,
+            'm2': 0.0,
+            'ema': None,
+            'ema_previous': None,
+            'values': [],
+        }
+
+    def variance(self):
+        if self.state['count'] == 0:
+            return 0.0
+        return self.state['m2'] / self.state['count']
+
+    def stdDev(self):
+        return math.sqrt(self.variance())
+
+    def isOutlier(self, value):
+        # Values beyond 3 standard deviations from the running mean, once a
+        # full period has been seen; a few near-identical early samples give a
+        # standard deviation so small that ordinary noise would be rejected
+        return (
+            self.state['count'] >= self.state['period']
+            and abs(value - self.state['mean']) > 3 * self.stdDev()
+        )
+
+    def push(self, date, value):
+        state = self.state
+        outlier = self.isOutlier(value)
+
+        state['count'] += 1
+        delta = value - state['mean']
+        state['mean'] += delta / state['count']
+        state['m2'] += delta * (value - state['mean'])
+
+        state['ema_previous'] = state['ema']
+        if not outlier:
+            window = min(state['period'], max(1, state['count'] // 2))
+            alpha = 2 / (window + 1)
+            if state['ema'] is None:
+                state['ema'] = value
+            else:
+                state['ema'] = alpha * value + (1 - alpha) * state['ema']
+
+        state['values'].append({'date': date, 'value': value})
+        del state['values'][: -state['retention']]
+
+    def last(self):
+        values = self.state['values']
+        return values[-1]['value'] if values else None
+
+    def lastDate(self):
+        values = self.state['values']
+        return values[-1]['date'] if values else None
+
+    def emaPrevious(self):
+        return self.state['ema_previous']
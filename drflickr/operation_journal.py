@@ -0,0 +1,108 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+from collections import namedtuple
+import threading
+import json
+import time
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class OperationJournal:
+    def __init__(self, filename, config, dry_run):
+        self.filename = filename
+        self.config = config
+        self.dry_run = dry_run
+        self.lock = threading.Lock()
+        self.file = None
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def readRecords(self):
+        if not os.path.exists(self.filename):
+            return []
+        records = []
+        with open(self.filename) as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # torn write of the last record before the process died
+                    logger.warning(f'ignoring incomplete journal record')
+                    break
+        return records
+
+    def interrupted(self):
+        records = self.readRecords()
+        if not records or records[0]['type'] != 'plan' or records[-1]['type'] == 'end':
+            return None
+        plan = records[0]
+        if plan['resumed']:
+            # an interrupted resume may be stuck on one operation, re-plan instead
+            logger.warning(f'discarding journal of an interrupted resume')
+            return None
+        errors = {
+            record['index']: record['error']
+            for record in records[1:]
+            if record['type'] == 'done'
+        }
+        return namedtuple(
+            'InterruptedPlan', ['operations', 'photosets', 'completed']
+        )(
+            [op for index, op in enumerate(plan['operations']) if index not in errors],
+            plan['photosets'],
+            [(plan['operations'][index], error) for index, error in errors.items()],
+        )
+
+    def begin(self, operations, photosets, resumed=False):
+        with self.lock:
+            self.close()
+            if self.dry_run:
+                return
+            self.file = open(self.filename, 'w')
+            self.write(
+                {
+                    'type': 'plan',
+                    'time': time.time(),
+                    'resumed': resumed,
+                    'operations': operations,
+                    'photosets': photosets,
+                },
+                sync=True,
+            )
+
+    def done(self, index, error):
+        with self.lock:
+            self.write({'type': 'done', 'index': index, 'error': error})
+
+    def end(self):
+        with self.lock:
+            self.write({'type': 'end'}, sync=True)
+            self.close()
+
+    def write(self, record, sync=False):
+        if self.file is None:
+            return
+        self.file.write(json.dumps(record) + '\n')
+        self.file.flush()
+        self.unsynced += 1
+        if (
+            sync
+            or self.unsynced >= self.config['fsync_every']
+            or time.monotonic() - self.last_sync >= self.config['fsync_interval_s']
+        ):
+            self.sync()
+
+    def sync(self):
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def close(self):
+        if self.file is not None:
+            self.sync()
+            self.file.close()
+            self.file = None
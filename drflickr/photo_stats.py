@@ -0,0 +1,79 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+from datetime import date, timedelta, datetime
+from drresult import Ok, Err, returns_result
+from mrjsonstore import JsonStore
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PhotoStats:
+    metrics = ['views', 'faves']
+
+    def __init__(self, api, filename, config):
+        self.api = api
+        self.filename = filename
+        self.config = config
+        self.stats = None
+
+    @returns_result
+    def load(self):
+        self.stats = JsonStore(self.filename).unwrap_or_raise()
+        self.stats.content.setdefault('dates', [])
+        self.stats.content.setdefault('columns', {})
+        for metric in PhotoStats.metrics:
+            self.stats.content['columns'].setdefault(metric, {})
+        return Ok(self)
+
+    @returns_result
+    def update(self):
+        if not self.config['enabled']:
+            return Ok(self)
+        today = date.today() - timedelta(days=1)
+        dates = self.stats.content['dates']
+        first_date = today - timedelta(days=self.config['retention_days'] - 1)
+        if dates:
+            first_date = max(
+                first_date,
+                datetime.strptime(dates[-1], '%Y-%m-%d').date() + timedelta(days=1),
+            )
+        missing = [
+            first_date + timedelta(days=day)
+            for day in range((today - first_date).days + 1)
+        ]
+        for day in missing:
+            result = self.api.getPopularPhotos(day)
+            if result.is_err() and result.unwrap_err().isApiError():
+                logger.warning(f'per-photo stats unavailable: {result.unwrap_err()}')
+                return Ok(self)
+            self.append(day.strftime('%Y-%m-%d'), result.unwrap_or_return())
+            self.stats.commit().unwrap_or_raise()
+        return Ok(self)
+
+    def append(self, day, photos):
+        dates = self.stats.content['dates']
+        columns = self.stats.content['columns']
+        dates.append(day)
+        for metric in PhotoStats.metrics:
+            column = columns[metric]
+            for photo_id, values in column.items():
+                values.append(photos.get(photo_id, {}).get(metric, 0))
+            for photo_id, photo in photos.items():
+                if photo_id not in column:
+                    column[photo_id] = [0] * (len(dates) - 1) + [photo[metric]]
+
+        retention = self.config['retention_days']
+        if len(dates) > retention:
+            del dates[:-retention]
+            for metric in PhotoStats.metrics:
+                columns[metric] = {
+                    photo_id: values[-retention:]
+                    for photo_id, values in columns[metric].items()
+                    if any(values[-retention:])
+                }
+
+    def trend(self, photo_id, metric, days):
+        values = self.stats.content['columns'][metric].get(photo_id, [])
+        return sum(values[-days:])
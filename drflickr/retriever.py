@@ -3,45 +3,171 @@
 
 from drresult import Ok, Err, returns_result
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
 from drflickr.blacklist_updater import BlacklistUpdater
 
 import json
+import time
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 class Retriever:
-    def __init__(self, api, submissions):
+    def __init__(self, api, submissions, snapshot, context_cache, config, managed_album):
         self.api = api
         self.submissions = submissions
+        self.snapshot = snapshot
+        self.context_cache = context_cache
+        self.config = config
+        self.managed_album = managed_album
         self.blacklist_updater = BlacklistUpdater()
 
     @returns_result()
     def __call__(self, blacklist):
         blacklist = json.loads(json.dumps(blacklist))
-        photos_actual = self.api.getPhotos(
-            sort='interestingness-desc'
-        ).unwrap_or_return()
+        full_sync = self.isFullSync()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            photos_future = executor.submit(
+                self.api.getPhotos, sort='interestingness-desc'
+            )
+            photosets_future = executor.submit(self.getPhotosetPhotos, full_sync)
+            photos_actual = photos_future.result()
+            photosets = photosets_future.result()
+        photos_actual = photos_actual.unwrap_or_return()
+        photosets, photoset_photos = photosets.unwrap_or_return()
+
+        if self.config['album_scoped']:
+            managed_photos = set(photoset_photos.get(self.managed_album, []))
+            photos_actual = {
+                id: photo
+                for id, photo in photos_actual.items()
+                if id in managed_photos
+            }
+            logger.info(
+                f'album scoped retrieval: {len(photos_actual)} photos in {self.managed_album}'
+            )
+
+        actual_groups = self.getActualGroups(photos_actual).unwrap_or_return()
         for photo in photos_actual.values():
             blacklist = self.blacklist_updater(
                 photo_id=photo['id'],
                 submitted_groups=self.submissions.getGroups(photo),
-                actual_groups=photo['groups'],
+                actual_groups=actual_groups[photo['id']],
                 blacklist=blacklist
             )
             photo['groups'] = self.submissions.getGroups(photo)
             photo['sets'] = {}
 
-        photosets = self.api.getPhotosets().unwrap_or_return()
-        for name, id in photosets.items():
-            photoset_photos = self.api.getPhotoset(id).unwrap_or_return()
-            for index, photo_id in enumerate(photoset_photos):
-                photos_actual[photo_id]['sets'][name] = index
+        for name, photo_ids in photoset_photos.items():
+            for index, photo_id in enumerate(photo_ids):
+                if photo_id in photos_actual:
+                    photos_actual[photo_id]['sets'][name] = index
+
+        pool_counts = {id: len(groups) for id, groups in actual_groups.items()}
 
         return Ok(
-            namedtuple('RetrieverResult', ['photos_actual', 'photosets_map', 'blacklist'])(
-                photos_actual, photosets, blacklist
-            )
+            namedtuple(
+                'RetrieverResult',
+                ['photos_actual', 'photosets_map', 'blacklist', 'pool_counts'],
+            )(photos_actual, photosets, blacklist, pool_counts)
+        )
+
+    def isFullSync(self):
+        self.snapshot.content.setdefault('last_full_sync', 0)
+        return (
+            self.snapshot.content['last_full_sync']
+            + self.config['full_sync_hours'] * 60 * 60
+        ) < time.time()
+
+    @returns_result()
+    def getPhotosetPhotos(self, full_sync):
+        photosets = self.api.getPhotosets().unwrap_or_return()
+        cached = self.snapshot.content.get('photosets', {})
+        changed = {
+            name: photoset
+            for name, photoset in photosets.items()
+            if full_sync
+            or photoset['id'] not in cached
+            or cached[photoset['id']]['count'] != photoset['count']
+            or cached[photoset['id']]['date_update'] != photoset['date_update']
+        }
+        logger.info(
+            f'photosets: {len(changed)} of {len(photosets)} changed since last cycle'
         )
+        with ThreadPoolExecutor(
+            max_workers=self.config['photoset_concurrency']
+        ) as executor:
+            futures = {
+                name: executor.submit(self.api.getPhotoset, photoset['id'])
+                for name, photoset in changed.items()
+            }
+            results = {name: future.result() for name, future in futures.items()}
+        photoset_photos = {
+            name: (
+                results[name].unwrap_or_return()
+                if name in results
+                else cached[photoset['id']]['photos']
+            )
+            for name, photoset in photosets.items()
+        }
+
+        with self.snapshot.transaction() as t:
+            if full_sync:
+                self.snapshot.content['last_full_sync'] = time.time()
+            self.snapshot.content['photosets'] = {
+                photoset['id']: {
+                    'count': photoset['count'],
+                    'date_update': photoset['date_update'],
+                    'photos': photoset_photos[name],
+                }
+                for name, photoset in photosets.items()
+            }
+        t.result.unwrap_or_return()
+        photosets_map = {name: photoset['id'] for name, photoset in photosets.items()}
+        return Ok((photosets_map, photoset_photos))
+
+    @returns_result()
+    def getActualGroups(self, photos_actual):
+        self.snapshot.content.setdefault('photos', {})
+        snapshot = self.snapshot.content['photos']
+
+        last_update = {id: photo.pop('last_update') for id, photo in photos_actual.items()}
+        with self.context_cache.transaction() as t:
+            self.context_cache.resetCounters()
+            self.context_cache.retain(photos_actual.keys())
+            for id in photos_actual:
+                if id not in snapshot or snapshot[id]['last_update'] != last_update[id]:
+                    self.context_cache.invalidate(id)
+            actual_groups = {id: self.context_cache.get(id) for id in photos_actual}
+            stale = [id for id, groups in actual_groups.items() if groups is None]
+            logger.info(
+                f'context cache: {self.context_cache.hits} hits, {self.context_cache.misses} misses'
+            )
+            # keep every context that arrived even if others failed, so a cycle
+            # cut short by the deadline still moves the cache forward
+            error = None
+            refreshed = self.api.collectConcurrently(
+                self.api.getPhotoGroups, [(id,) for id in stale]
+            )
+            for id, result in zip(stale, refreshed):
+                if result.is_ok():
+                    self.context_cache.put(id, result.unwrap())
+                    actual_groups[id] = result.unwrap()
+                elif error is None:
+                    error = result
+        t.result.unwrap_or_return()
+
+        with self.snapshot.transaction() as t:
+            self.snapshot.content['photos'] = {
+                id: {'last_update': last_update[id]}
+                for id in photos_actual
+                if actual_groups[id] is not None
+            }
+        t.result.unwrap_or_return()
+        if error is not None:
+            fetched = sum(result.is_ok() for result in refreshed)
+            logger.warning(f'context refresh incomplete: {fetched} of {len(stale)} fetched')
+            return error
+        return Ok(actual_groups)
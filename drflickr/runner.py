@@ -2,17 +2,23 @@
 # SPDX-License-Identifier: Apache-2.0
 
 from drflickr.file import readYaml, writeYaml, readJson, writeJson, mkdir
+from drflickr.config_defaults import readConfig
 from drflickr.credentials import getCredentials
 from drflickr.api import Api
 from drflickr.greylist import Greylist
 from drflickr.submissions import Submissions
 from drflickr.retriever import Retriever
+from drflickr.context_cache import ContextCache
 from drflickr.logic import Logic
 from drflickr.reconciler import Reconciler
 from drflickr.applicator import Applicator
+from drflickr.operation_journal import OperationJournal
 from drflickr.stats import Stats
+from drflickr.photo_stats import PhotoStats
 from drflickr.operations_review import OperationsReview
 from drflickr.group_info_updater import GroupInfoUpdater
+from drflickr.deadline import Deadline, DeadlineExceeded
+from drflickr.task_graph import TaskGraph
 from mrjsonstore import JsonStore
 from drresult import Ok, Err, returns_result
 import yaml
@@ -41,83 +47,290 @@ class Runner:
         self.config_filename = os.path.join(config_path, 'config.yaml')
         self.submissions_filename = os.path.join(run_path, 'submissions.json')
         self.stats_filename = os.path.join(run_path, 'stats.json')
+        self.photo_stats_filename = os.path.join(run_path, 'photo_stats.json')
         self.state_store_filename = os.path.join(run_path, 'state_store.json')
         self.blacklist_filename = os.path.join(run_path, 'blacklist.json')
+        self.retriever_snapshot_filename = os.path.join(
+            run_path, 'retriever_snapshot.json'
+        )
+        self.context_cache_filename = os.path.join(run_path, 'context_cache.json')
+        self.write_throttle_filename = os.path.join(run_path, 'write_throttle.json')
+        self.operation_journal_filename = os.path.join(run_path, 'operations.journal')
+
+        self.config_filenames = [
+            self.views_groups_filename,
+            self.favorites_groups_filename,
+            self.tag_groups_filename,
+            self.config_filename,
+        ]
 
+        self.config_mtimes = None
+        self.config = None
+        self.api = None
+        self.submissions = None
+        self.stats = None
+        self.photo_stats = None
+        self.context_cache_store = None
+        self.context_cache = None
+        self.write_throttle_store = None
+        self.operation_journal = None
+        self.retriever_snapshot = None
         self.state_store = None
         self.blacklist_store = None
+        self.tag_groups = None
+        self.managed_album = None
+        self.group_info_updater = None
+        self.all_groups = None
         self.retriever = None
         self.logic = None
         self.applicator = None
-        self.operations_review = None
 
     @returns_result()
     def load(self):
         logger.info(f'initializing')
-        mkdir(self.run_path).unwrap_or_return()
-        api_key = getCredentials(self.creds_path, 'api-key').unwrap_or_return()
-        access_token = readYaml(self.access_token_filename).unwrap_or_return()
+        config_mtimes = self.getConfigMtimes()
+        graph = TaskGraph('initialization')
+        graph.add('run_path', lambda: mkdir(self.run_path))
+        graph.add('api_key', lambda: getCredentials(self.creds_path, 'api-key'))
+        graph.add('access_token', lambda: readYaml(self.access_token_filename))
+        graph.add('config', lambda: readConfig(self.config_filename))
+        graph.add(
+            'api',
+            lambda api_key, access_token, config: Api(
+                dry_run=self.dry_run,
+                api_key=api_key,
+                access_token=access_token,
+                config=config['api'],
+            ).load(),
+            ['api_key', 'access_token', 'config'],
+        )
+        graph.add(
+            'stats',
+            lambda api, run_path: Stats(api, self.stats_filename).load(),
+            ['api', 'run_path'],
+        )
+        graph.add(
+            'photo_stats',
+            lambda api, config, run_path: PhotoStats(
+                api, self.photo_stats_filename, config['photo_stats']
+            ).load(),
+            ['api', 'config', 'run_path'],
+        )
+        graph.add(
+            'submissions',
+            lambda config, run_path: Submissions(
+                self.submissions_filename,
+                dry_run=self.local_dry_run,
+                config=config['submissions'],
+            ),
+            ['config', 'run_path'],
+        )
+        for name, filename in [
+            ('state_store', self.state_store_filename),
+            ('blacklist_store', self.blacklist_filename),
+            ('retriever_snapshot', self.retriever_snapshot_filename),
+            ('context_cache_store', self.context_cache_filename),
+            ('write_throttle_store', self.write_throttle_filename),
+        ]:
+            graph.add(
+                name,
+                lambda run_path, filename=filename: JsonStore(
+                    filename, dry_run=self.local_dry_run
+                ),
+                ['run_path'],
+            )
+        graph.add(
+            'operation_journal',
+            lambda config, run_path: Ok(
+                OperationJournal(
+                    self.operation_journal_filename,
+                    config['applicator']['journal'],
+                    dry_run=self.local_dry_run,
+                )
+            ),
+            ['config', 'run_path'],
+        )
+        results = graph().unwrap_or_return()
+
+        self.api = results['api']
+        self.stats = results['stats']
+        self.photo_stats = results['photo_stats']
+        self.submissions = results['submissions']
+        self.state_store = results['state_store']
+        self.blacklist_store = results['blacklist_store']
+        self.retriever_snapshot = results['retriever_snapshot']
+        self.context_cache_store = results['context_cache_store']
+        self.write_throttle_store = results['write_throttle_store']
+        self.operation_journal = results['operation_journal']
+        self.api.write_throttle.restore(self.write_throttle_store.content)
+
+        self.configure(config_mtimes).unwrap_or_return()
+
+        logger.info(f'initialization done')
+        return Ok(self)
+
+    def getConfigMtimes(self):
+        return {
+            filename: os.stat(filename).st_mtime
+            for filename in self.config_filenames
+            if os.path.exists(filename)
+        }
+
+    @returns_result()
+    def reloadConfig(self):
+        config_mtimes = self.getConfigMtimes()
+        if config_mtimes != self.config_mtimes:
+            logger.info(f'configuration changed, reloading')
+            self.configure(config_mtimes).unwrap_or_return()
+        return Ok(self)
+
+    @returns_result()
+    def configure(self, config_mtimes):
         views_groups = readYaml(self.views_groups_filename).unwrap_or_return()
         favorites_groups = readYaml(self.favorites_groups_filename).unwrap_or_return()
         tag_groups = readYaml(self.tag_groups_filename).unwrap_or_return()
-        config = readYaml(self.config_filename).unwrap_or_return()
-        if self.dry_run:
-            config['applicator']['throttle']['min_ms'] = 0
-            config['applicator']['throttle']['max_ms'] = 1
-
-        submissions = Submissions(self.submissions_filename, dry_run=self.local_dry_run).unwrap_or_raise()
-        api = (
-            Api(dry_run=self.dry_run, api_key=api_key, access_token=access_token)
-            .load()
-            .unwrap_or_return()
-        )
-        logger.info(f'initializing stats...')
-        stats = Stats(api, self.stats_filename).load().unwrap_or_raise()
+        config = readConfig(self.config_filename).unwrap_or_return()
+        if config['api'] != self.api.config:
+            logger.warning(f'changes to api settings take effect on restart')
 
-        self.state_store = JsonStore(self.state_store_filename, dry_run=self.local_dry_run).unwrap_or_raise()
-        self.blacklist_store = JsonStore(self.blacklist_filename, dry_run=self.local_dry_run).unwrap_or_raise()
-        self.retriever = Retriever(api, submissions)
+        self.photo_stats.config = config['photo_stats']
+        self.operation_journal.config = config['applicator']['journal']
+        self.context_cache = ContextCache(
+            self.context_cache_store, config['retriever']['context_cache']
+        )
+        self.retriever = Retriever(
+            self.api,
+            self.submissions,
+            self.retriever_snapshot,
+            self.context_cache,
+            config['retriever'],
+            managed_album=config['logic']['managed_album'],
+        )
         self.logic = Logic(
             views_groups=views_groups,
             favorites_groups=favorites_groups,
             tag_groups=tag_groups,
             config=config['logic'],
-            stats=stats,
+            stats=self.stats,
         )
-
-        all_groups = [
+        self.tag_groups = tag_groups
+        self.managed_album = config['logic']['managed_album']
+        self.group_info_updater = GroupInfoUpdater(self.api, config['group_info'])
+        self.all_groups = [
             group
             for group in list(tag_groups.keys())
             + [group['nsid'] for group in views_groups]
             + [group['nsid'] for group in favorites_groups]
         ]
-        logger.info(f'initializing group info...')
-        group_info_updater = GroupInfoUpdater(api)
-        self.state_store.transaction()
-        self.state_store.content.setdefault('group_info', {})
-        self.state_store.content['group_info'] = group_info_updater(self.state_store.content['group_info'], all_groups)
-        self.state_store.commit().unwrap_or_raise()
-
         self.applicator = Applicator(
-            api,
-            submissions,
-            self.state_store.content['group_info'],
+            self.api,
+            self.submissions,
+            self.context_cache,
+            self.operation_journal,
             config['applicator'],
         )
-        self.operations_review = OperationsReview(self.state_store.content['group_info'])
-
-        logger.info(f'initialization done')
+        self.config = config['runner']
+        self.config_mtimes = config_mtimes
         return Ok(self)
 
+    def getCandidateGroups(self, photos_actual):
+        photo_tags = [
+            set(photo['tags'])
+            for photo in photos_actual.values()
+            if self.managed_album in photo['sets']
+        ]
+        return set(
+            group_id
+            for group_id, group in self.tag_groups.items()
+            if any(
+                set(group['tags'].get('require', [])).issubset(tags)
+                and not set(group['tags'].get('exclude', [])).intersection(tags)
+                for tags in photo_tags
+            )
+        )
+
+    @returns_result()
+    def updateGroupInfo(self, candidate_groups):
+        logger.info(f'updating group info...')
+        with self.state_store.transaction() as t:
+            state = self.state_store.content
+            state.setdefault('group_info', {})
+            # photos keep unconfigured groups they are in, the reconciler
+            # still needs info on those to restore membership
+            retained_groups = self.submissions.getAllGroups().union(
+                group_id
+                for photo in state.get('photos_expected', {}).values()
+                for group_id in photo['groups']
+            )
+            state['group_info'] = self.group_info_updater(
+                state['group_info'],
+                self.all_groups,
+                candidate_groups,
+                retained_groups,
+            )
+        return t.result
+
+    def close(self):
+        if self.api:
+            self.api.close()
+        if self.submissions:
+            self.submissions.close()
+
+    @returns_result()
+    def applyOperations(self, apply):
+        with self.state_store.transaction() as t:
+            state = self.state_store.content
+            state.setdefault('applicator_greylist', {})
+            state.setdefault('group_info', {})
+            with self.context_cache.transaction() as c:
+                applicator_result = apply(
+                    state['applicator_greylist'], state['group_info']
+                )
+            c.result.unwrap_or_return()
+            state['applicator_greylist'] = applicator_result.greylist
+        t.result.unwrap_or_return()
+        with self.write_throttle_store.transaction() as t:
+            self.write_throttle_store.content.update(self.api.write_throttle.to_dict())
+        t.result.unwrap_or_return()
+        logger.debug(f'reconciled: {applicator_result.result}')
+        logger.info(f'connection pool: {self.api.connectionStats()}')
+
+        return Ok(applicator_result.result)
+
     @returns_result()
     def __call__(self):
+        self.reloadConfig().unwrap_or_return()
+        deadline = Deadline(self.config['cycle_budget_minutes'] * 60)
+        self.api.setDeadline(deadline)
+        if self.operation_journal.interrupted():
+            return self.applyOperations(
+                lambda greylist, group_info: self.applicator.resume(
+                    greylist, group_info, deadline
+                )
+            )
+        graph = TaskGraph('cycle preparation')
+        graph.add('stats', self.stats.update)
+        graph.add('photo_stats', self.photo_stats.update)
+        graph().unwrap_or_return()
         logger.info(f'retrieving photos...')
+        retriever_result = self.retriever(self.blacklist_store.content)
+        if retriever_result.is_err() and isinstance(
+            retriever_result.unwrap_err(), DeadlineExceeded
+        ):
+            logger.warning(f'cycle deadline exceeded during retrieval')
+            return Ok(False)
+        retriever_result = retriever_result.unwrap_or_raise()
         with self.blacklist_store.transaction() as t:
             blacklist = self.blacklist_store.content
-            retriever_result = self.retriever(blacklist).unwrap_or_raise()
             blacklist.clear()
             blacklist.update(retriever_result.blacklist)
         t.result.unwrap_or_raise()
+        self.updateGroupInfo(
+            self.getCandidateGroups(retriever_result.photos_actual)
+        ).unwrap_or_return()
+        if deadline.expired():
+            logger.warning(f'cycle deadline exceeded after retrieval')
+            return Ok(False)
         logger.info(f'running logic...')
         with self.state_store.transaction() as t:
             state = self.state_store.content
@@ -133,6 +346,7 @@ class Runner:
                 group_info=state['group_info'],
                 photo_info=state['photo_info'],
                 blacklist=retriever_result.blacklist,
+                pool_counts=retriever_result.pool_counts,
             )
 
             state['photos_expected'] = logic_result.photos_expected
@@ -146,19 +360,15 @@ class Runner:
             ).unwrap_or_return()
             writeYaml(
                 'operations-review.yaml',
-                self.operations_review(logic_result.operations),
+                OperationsReview(logic_result.group_info)(logic_result.operations),
             ).unwrap_or_return()
         logger.info(f'applying changes...')
-        with self.state_store.transaction() as t:
-            state = self.state_store.content
-            state.setdefault('applicator_greylist', {})
-            applicator_result = self.applicator(
+        return self.applyOperations(
+            lambda greylist, group_info: self.applicator(
                 logic_result.operations,
                 retriever_result.photosets_map,
-                state['applicator_greylist'],
+                greylist,
+                group_info,
+                deadline,
             )
-            state['applicator_greylist'] = applicator_result.greylist
-        t.result.unwrap_or_return()
-        logger.debug(f'reconciled: {applicator_result.result}')
-
-        return Ok(applicator_result.result)
+        )
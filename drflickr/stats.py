@@ -2,71 +2,83 @@
 # SPDX-License-Identifier: Apache-2.0
 
 from drflickr.api import Api
+from drflickr.metric_series import MetricSeries
 from datetime import date, timedelta, datetime
 from drresult import Ok, Err, returns_result
 from mrjsonstore import JsonStore
-import math
 import logging
 
 logger = logging.getLogger(__name__)
 
 class Stats:
+    CHUNK_SIZE = 7
+
     def __init__(self, api, filename):
         self.api = api
         self.filename = filename
         self.stats = None
         self.period = 28
+        self.retention = self.period * 2
 
     @returns_result
     def load(self):
         self.stats = JsonStore(self.filename).unwrap_or_raise()
-        self.stats.content.setdefault('views', {})
-        self.stats.content['views'].setdefault('total', [])
-        today = date.today() - timedelta(days=1)
-        values = self.stats.content['views']['total']
-        if len(values) == 0:
-            last_date = today - timedelta(days=(self.period * 2))
-        else:
-            last_date = datetime.strptime(values[-1]['date'], '%Y-%m-%d').date()
-        while last_date < today:
-            last_date += timedelta(days=1)
-            total_views = self.api.getTotalViews(last_date)
-            values.append(
-                {'date': last_date.strftime('%Y-%m-%d'), 'value': total_views}
-            )
-        self.stats.commit().unwrap_or_raise()
+        self.stats.content.setdefault('series', {})
+        self.migrate().unwrap_or_raise()
+        self.update().unwrap_or_raise()
         return Ok(self)
 
-    def filterOutliers(self, data):
-        if len(data) == 0:
-            return []
-
-        mean = sum(data) / len(data)
-        variance = sum((x - mean) ** 2 for x in data) / len(data)
-        std_dev = math.sqrt(variance)
-
-        # Filter values within 3 standard deviations from the mean
-        return [x for x in data if abs(x - mean) <= 3 * std_dev]
-
-    def calcEma(self, values):
-        window = min(self.period, int(len(values) / 2))
-        if not values or window <= 0:
-            return None
-
-        alpha = 2 / (window + 1)
-        ema = values[0]
+    def series(self, name):
+        return MetricSeries(
+            self.stats.content['series'].setdefault(
+                name, MetricSeries.initialState(self.period, self.retention)
+            )
+        )
 
-        for value in values[1:]:
-            ema = alpha * value + (1 - alpha) * ema
+    @returns_result
+    def migrate(self):
+        if 'views' in self.stats.content:
+            legacy = self.stats.content['views'].get('total', [])
+            logger.info(f'migrating {len(legacy)} stats values')
+            series = self.series('views.total')
+            for value in legacy:
+                series.push(value['date'], value['value'])
+            del self.stats.content['views']
+            self.stats.commit().unwrap_or_raise()
+        return Ok(self)
 
-        return ema
+    @returns_result
+    def update(self):
+        today = date.today() - timedelta(days=1)
+        series = self.series('views.total')
+        if series.lastDate() is None:
+            last_date = today - timedelta(days=(self.period * 2))
+        else:
+            last_date = datetime.strptime(series.lastDate(), '%Y-%m-%d').date()
+        missing = [
+            last_date + timedelta(days=day)
+            for day in range(1, (today - last_date).days + 1)
+        ]
+        if missing:
+            logger.info(f'fetching total views for {len(missing)} days')
+        for start in range(0, len(missing), Stats.CHUNK_SIZE):
+            chunk = missing[start : start + Stats.CHUNK_SIZE]
+            total_views = self.api.runConcurrently(
+                self.api.getTotalViews, [(day,) for day in chunk]
+            ).unwrap_or_return()
+            for day, views in zip(chunk, total_views):
+                series.push(day.strftime('%Y-%m-%d'), views)
+            self.stats.commit().unwrap_or_raise()
+        return Ok(self)
 
     def viewsBelowEma(self):
         logger.info(f'checking views agains EMA')
-        views = [x['value'] for x in self.stats.content['views']['total']]
-        views = self.filterOutliers(views)
-        ema = self.calcEma(views[:-1])
+        series = self.series('views.total')
+        ema = series.emaPrevious()
+        today = series.last()
+        if ema is None:
+            logger.info(f'not enough views data for EMA')
+            return False
         ema = ema * 1.4
-        today = views[-1]
         logger.info(f'views EMA: {ema}, views today: {today}')
         return today < ema
@@ -1,8 +1,11 @@
 # Copyright 2024 Ole Kliemann
 # SPDX-License-Identifier: Apache-2.0
 
+import threading
+import json
+import os
 import logging
-from drresult import constructs_as_result, returns_result
+from drresult import Ok, constructs_as_result, returns_result
 from mrjsonstore import JsonStore
 
 logger = logging.getLogger(__name__)
@@ -10,36 +13,132 @@ logger = logging.getLogger(__name__)
 
 @constructs_as_result
 class Submissions:
-    def __init__(self, filename, dry_run):
-        self.submissions = JsonStore(filename, dry_run=dry_run).unwrap_or_raise()
+    def __init__(self, filename, dry_run, config):
+        self.dry_run = dry_run
+        self.config = config
+        self.journal_filename = os.path.splitext(filename)[0] + '.journal'
+        self.rotated_filename = self.journal_filename + '.1'
+        self.snapshot = JsonStore(filename, dry_run=dry_run).unwrap_or_raise()
+        self.lock = threading.Lock()
+        self.compaction = None
+        self.content = json.loads(json.dumps(self.snapshot.content))
+        # replaying records the snapshot already contains is harmless, every
+        # record just sets the final state of one photo/group pair
+        self.replay(self.rotated_filename)
+        self.records = self.replay(self.journal_filename)
+        self.journal = None
+        if not self.dry_run:
+            self.journal = open(self.journal_filename, 'a')
+            if os.path.exists(self.rotated_filename):
+                self.compact()
+
+    def replay(self, filename):
+        if not os.path.exists(filename):
+            return 0
+        records = 0
+        with open(filename) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f'ignoring incomplete record in {filename}')
+                    break
+                if record['op'] == 'add':
+                    self.content.setdefault(record['photo'], {})[record['group']] = True
+                else:
+                    self.content.setdefault(record['photo'], {}).pop(record['group'], None)
+                records += 1
+        return records
+
+    def append(self, op, photo, group_id):
+        if self.journal is None:
+            return
+        self.journal.write(
+            json.dumps({'op': op, 'photo': photo['id'], 'group': group_id}) + '\n'
+        )
+        self.journal.flush()
+        self.records += 1
+        if self.records >= self.config['compact_records']:
+            self.compact()
+
+    def compact(self):
+        # called with the lock held or before the store is shared
+        if self.compaction and self.compaction.is_alive():
+            return
+        self.journal.close()
+        if os.path.exists(self.rotated_filename):
+            # an earlier compaction did not finish, fold into its rotation
+            with open(self.journal_filename) as journal, open(
+                self.rotated_filename, 'a'
+            ) as rotated:
+                rotated.write(journal.read())
+            os.remove(self.journal_filename)
+        else:
+            os.replace(self.journal_filename, self.rotated_filename)
+        self.journal = open(self.journal_filename, 'a')
+        self.records = 0
+        content = json.loads(json.dumps(self.content))
+        self.compaction = threading.Thread(
+            target=self.writeSnapshot, args=(content,), name='submissions compaction'
+        )
+        self.compaction.start()
+
+    def writeSnapshot(self, content):
+        with self.snapshot.transaction() as t:
+            self.snapshot.content.clear()
+            self.snapshot.content.update(content)
+        if t.result.is_ok():
+            os.remove(self.rotated_filename)
+            logger.debug(f'submissions compacted')
+        else:
+            logger.warning(f'compacting submissions: {t.result.unwrap_err()}')
+
+    def close(self):
+        with self.lock:
+            if self.compaction:
+                self.compaction.join()
+            if self.journal is not None:
+                self.journal.close()
+                self.journal = None
 
     def _add(self, photo, group_id):
-        self.submissions.content.setdefault(photo['id'], {})
-        self.submissions.content[photo['id']][group_id] = True
+        self.content.setdefault(photo['id'], {})
+        self.content[photo['id']][group_id] = True
 
     @returns_result
     def add(self, photo, group_id):
-        with self.submissions.transaction() as t:
+        with self.lock:
             self._add(photo, group_id)
-        return t.result
+            self.append('add', photo, group_id)
+        return Ok(None)
 
     @returns_result
     def remove(self, photo, group_id):
-        with self.submissions.transaction() as t:
-            self.submissions.content.setdefault(photo['id'], {})
-            del self.submissions.content[photo['id']][group_id]
-        return t.result
+        with self.lock:
+            self.content.setdefault(photo['id'], {})
+            del self.content[photo['id']][group_id]
+            self.append('remove', photo, group_id)
+        return Ok(None)
 
     def isPhotoInGroup(self, photo, group_id):
-        view = self.submissions.content
+        view = self.content
         return (photo['id'] in view) and view[photo['id']].get(group_id, False)
 
     def getGroups(self, photo):
-        view = self.submissions.content
+        view = self.content
         view.setdefault(photo['id'], {})
         return [
             group for group in view[photo['id']] if view[photo['id']].get(group, False)
         ]
 
+    def getAllGroups(self):
+        view = self.content
+        return set(
+            group
+            for photo_id in view
+            for group in view[photo_id]
+            if view[photo_id].get(group, False)
+        )
+
     def isEmpty(self):
-        return len(self.submissions.content) == 0
+        return len(self.content) == 0
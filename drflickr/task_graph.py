@@ -0,0 +1,66 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+from drresult import Ok, Err, returns_result
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TaskGraph:
+    def __init__(self, name, max_workers=4):
+        self.name = name
+        self.max_workers = max_workers
+        self.tasks = {}
+
+    def add(self, name, task, dependencies=[], priority=0):
+        assert name not in self.tasks
+        self.tasks[name] = (task, list(dependencies), (priority, len(self.tasks)))
+
+    def runTask(self, name, task, args):
+        start = time.monotonic()
+        result = task(*args)
+        logger.debug(f'{self.name}: {name} took {time.monotonic() - start:.2f}s')
+        return result
+
+    @returns_result()
+    def __call__(self):
+        start = time.monotonic()
+        results = {}
+        pending = dict(self.tasks)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                # start ready tasks lowest priority value first, never queueing
+                # more than the workers can take so late arrivals can overtake
+                ready = sorted(
+                    (
+                        name
+                        for name, (task, dependencies, priority) in pending.items()
+                        if all(dependency in results for dependency in dependencies)
+                    ),
+                    key=lambda name: pending[name][2],
+                )
+                for name in ready[: self.max_workers - len(running)]:
+                    task, dependencies, priority = pending.pop(name)
+                    future = executor.submit(
+                        self.runTask,
+                        name,
+                        task,
+                        [results[dependency] for dependency in dependencies],
+                    )
+                    running[future] = name
+                assert running, f'{self.name}: unresolvable dependencies {list(pending)}'
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    result = future.result()
+                    if result.is_err():
+                        for other in running:
+                            other.cancel()
+                        return result
+                    results[name] = result.unwrap()
+        logger.info(f'{self.name}: done in {time.monotonic() - start:.2f}s')
+        return Ok(results)
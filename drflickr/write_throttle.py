@@ -0,0 +1,44 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveThrottle:
+    def __init__(self, bucket, config):
+        self.bucket = bucket
+        self.config = config
+        self.lock = threading.Lock()
+        self.setRate(bucket.rate)
+
+    def bounds(self):
+        return {'min_rate': self.config['min_rate'], 'max_rate': self.config['max_rate']}
+
+    def setRate(self, rate):
+        self.rate = min(self.config['max_rate'], max(self.config['min_rate'], rate))
+        self.bucket.setRate(self.rate)
+
+    def restore(self, state):
+        # the persisted rate is clamped into the bounds currently configured
+        if 'rate' in state:
+            with self.lock:
+                self.setRate(state['rate'])
+            logger.info(f'write rate restored: {self.rate:.3f}/s')
+
+    def to_dict(self):
+        with self.lock:
+            return {'rate': self.rate, 'bounds': self.bounds()}
+
+    def record(self, success, latency):
+        with self.lock:
+            if success and latency <= self.config['latency_s']:
+                self.setRate(self.rate + self.config['increase'])
+            else:
+                self.setRate(self.rate * self.config['decrease'])
+                logger.info(
+                    f'write rate reduced to {self.rate:.3f}/s '
+                    f'(success: {success}, latency: {latency:.1f}s)'
+                )
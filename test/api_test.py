@@ -0,0 +1,169 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+from drflickr.api import Api, NetworkError
+from drflickr.config_defaults import config_defaults, withDefaults
+from drflickr.deadline import Deadline, DeadlineExceeded
+
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+import pytest
+import requests
+
+
+class TimeoutSession:
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, *args, **kwargs):
+        self.calls += 1
+        raise requests.exceptions.ReadTimeout('read timed out')
+
+    def close(self):
+        pass
+
+
+class Response:
+    def __init__(self, status_code, headers={}):
+        self.status_code = status_code
+        self.headers = headers
+        self.text = 'jsonFlickrApi({"stat": "ok"})'
+
+
+class ScriptedSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, *args, **kwargs):
+        self.calls += 1
+        response = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def close(self):
+        pass
+
+
+retry_config = withDefaults(
+    {
+        'rate_limit': {
+            'read': {'rate': 1000, 'burst': 1000},
+            'write': {'rate': 1000, 'burst': 1000},
+        },
+        'retry': {'max_attempts': 3, 'base_delay_ms': 100, 'budget_s': 30},
+        'write_throttle': {'max_rate': 1000},
+    },
+    config_defaults['api'],
+)
+
+
+def make_api(session=None, config=config_defaults['api']):
+    api = Api(False, {'key': '', 'secret': ''}, {'user_nsid': 'user'}, config)
+    api.auth = object()
+    api.session = session or TimeoutSession()
+    return api
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr('drflickr.api.time.sleep', sleeps.append)
+    return sleeps
+
+
+@pytest.mark.parametrize(
+    'failure',
+    [Response(429), Response(503), requests.exceptions.ConnectionError('reset')],
+)
+def test_read_is_retried_until_success(failure, sleeps):
+    api = make_api(ScriptedSession([failure, Response(200)]), retry_config)
+    result = api.call('photos.search')
+    api.close()
+    assert result.is_ok()
+    assert api.session.calls == 2
+    assert len(sleeps) == 1
+
+
+def test_read_gives_up_after_max_attempts(sleeps):
+    api = make_api(ScriptedSession([Response(503)]), retry_config)
+    result = api.call('photos.search')
+    api.close()
+    assert isinstance(result.unwrap_err(), NetworkError)
+    assert api.session.calls == 3
+    assert len(sleeps) == 2
+
+
+def test_read_is_not_retried_on_client_error(sleeps):
+    api = make_api(ScriptedSession([Response(403)]), retry_config)
+    assert api.call('photos.search').is_err()
+    api.close()
+    assert api.session.calls == 1
+
+
+def test_read_gives_up_when_retry_after_exceeds_budget(sleeps):
+    api = make_api(ScriptedSession([Response(429, {'Retry-After': '60'})]), retry_config)
+    assert api.call('photos.search').is_err()
+    api.close()
+    assert api.session.calls == 1
+    assert sleeps == []
+
+
+def test_read_gives_up_when_retry_would_pass_deadline(sleeps):
+    api = make_api(ScriptedSession([Response(429, {'Retry-After': '10'})]), retry_config)
+    api.setDeadline(Deadline(5))
+    assert api.call('photos.search').is_err()
+    api.close()
+    assert api.session.calls == 1
+    assert sleeps == []
+
+
+def test_read_fails_fast_after_deadline(sleeps):
+    api = make_api(ScriptedSession([Response(200)]), retry_config)
+    api.setDeadline(Deadline(0))
+    result = api.call('photos.search')
+    api.close()
+    assert isinstance(result.unwrap_err(), DeadlineExceeded)
+    assert api.session.calls == 0
+
+
+def test_retry_waits_at_least_retry_after(sleeps):
+    api = make_api(
+        ScriptedSession([Response(429, {'Retry-After': '7'}), Response(200)]), retry_config
+    )
+    assert api.call('photos.search').is_ok()
+    api.close()
+    assert sleeps[0] >= 7
+
+
+def test_parse_retry_after_seconds_and_http_date():
+    api = make_api()
+    api.close()
+    assert api.parseRetryAfter(Response(429, {'Retry-After': '12'})) == 12
+    assert api.parseRetryAfter(Response(429, {'Retry-After': '-3'})) == 0
+    assert api.parseRetryAfter(Response(429, {})) is None
+    date = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 < api.parseRetryAfter(Response(429, {'Retry-After': date})) <= 30
+    past = format_datetime(datetime.now(timezone.utc) - timedelta(seconds=30), usegmt=True)
+    assert api.parseRetryAfter(Response(429, {'Retry-After': past})) == 0
+
+
+@pytest.mark.parametrize('failure', [Response(429), Response(503)])
+def test_write_is_never_retried(failure, sleeps):
+    api = make_api(ScriptedSession([failure, Response(200)]), retry_config)
+    result = api.call('groups.pools.add', {'photo_id': 'photo-1', 'group_id': 'group-1'})
+    api.close()
+    assert isinstance(result.unwrap_err(), NetworkError)
+    assert api.session.calls == 1
+    assert sleeps == []
+
+
+def test_write_timeout_returns_network_error_without_retry():
+    api = make_api()
+    result = api.call('groups.pools.add', {'photo_id': 'photo-1', 'group_id': 'group-1'})
+    api.close()
+    assert result.is_err()
+    assert isinstance(result.unwrap_err(), NetworkError)
+    assert api.session.calls == 1
+    assert api.write_throttle.rate < config_defaults['api']['rate_limit']['write']['rate']
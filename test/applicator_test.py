@@ -0,0 +1,201 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+from drflickr.applicator import Applicator
+from drflickr.api import ApiError
+from drflickr.context_cache import ContextCache
+from drflickr.deadline import Deadline
+from drflickr.group_info import GroupInfo
+from drflickr.operation_journal import OperationJournal
+from drflickr.submissions import Submissions
+from drresult import Ok, Err
+from mrjsonstore import JsonStore
+
+import threading
+
+
+def op(method, photo_id, *params):
+    return {'method': method, 'params': [{'id': photo_id}, *params]}
+
+
+def op_for(method, photo, *params):
+    return {'method': method, 'params': [photo, *params]}
+
+
+def test_operations_on_same_photo_are_ordered():
+    operations = [
+        op('publishPhoto', 'photo-1'),
+        op('addPhotoToGroup', 'photo-1', 'group-1'),
+        op('addPhotoToGroup', 'photo-1', 'group-2'),
+    ]
+    assert Applicator.orderingDependencies(operations) == [[], [0], [1]]
+
+
+def test_operations_on_same_group_are_ordered():
+    operations = [
+        op('addPhotoToGroup', 'photo-1', 'group-1'),
+        op('addPhotoToGroup', 'photo-2', 'group-1'),
+        op('removePhotoFromGroup', 'photo-3', 'group-1'),
+    ]
+    assert Applicator.orderingDependencies(operations) == [[], [0], [1]]
+
+
+def test_independent_operations_have_no_dependencies():
+    operations = [
+        op('addPhotoToGroup', 'photo-1', 'group-1'),
+        op('addPhotoToGroup', 'photo-2', 'group-2'),
+        op('addPhotoToSet', 'photo-3', 'Set'),
+        op('updatePhotoDates', 'photo-4'),
+    ]
+    assert Applicator.orderingDependencies(operations) == [[], [], [], []]
+
+
+def test_operation_waits_for_photo_and_group():
+    operations = [
+        op('addPhotoToGroup', 'photo-1', 'group-1'),
+        op('addPhotoToGroup', 'photo-2', 'group-2'),
+        op('addPhotoToGroup', 'photo-1', 'group-2'),
+    ]
+    assert Applicator.orderingDependencies(operations) == [[], [], [0, 1]]
+
+
+def test_priority_runs_dates_and_publish_first_and_set_cleanup_last():
+    applicator = Applicator(None, None, None, None, {})
+    applicator.group_info = GroupInfo(
+        {
+            'group-1': {'name': 'group-1', 'throttle': {'mode': 'day', 'remaining': 5}},
+            'group-2': {'name': 'group-2', 'throttle': {'mode': 'day', 'remaining': 1}},
+            'group-3': {'name': 'group-3', 'throttle': {'mode': 'none'}},
+        }
+    )
+    operations = [
+        op('removePhotoFromSet', 'photo-1', 'Queue'),
+        op('addPhotoToGroup', 'photo-1', 'group-3'),
+        op('addPhotoToGroup', 'photo-1', 'group-1'),
+        op('addPhotoToGroup', 'photo-1', 'group-2'),
+        op('publishPhoto', 'photo-1'),
+        op('updatePhotoDates', 'photo-1'),
+    ]
+    ordered = sorted(operations, key=applicator.priority)
+    assert [(o['method'], o['params'][1:]) for o in ordered] == [
+        ('updatePhotoDates', []),
+        ('publishPhoto', []),
+        ('addPhotoToGroup', ['group-2']),
+        ('addPhotoToGroup', ['group-1']),
+        ('addPhotoToGroup', ['group-3']),
+        ('removePhotoFromSet', ['Queue']),
+    ]
+
+
+class FakeApi:
+    def __init__(self, errors={}):
+        self.errors = errors
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def record(self, method, photo, *params):
+        with self.lock:
+            self.calls.append((method, photo['id'], *params))
+        error = self.errors.get((method, photo['id'], *params))
+        if error:
+            return Err(ApiError(error))
+        return Ok({'stat': 'ok'})
+
+    def __getattr__(self, method):
+        return lambda photo, *params: self.record(method, photo, *params)
+
+
+def run_applicator(tmp_path, api, operations, deadline=None):
+    submissions = Submissions(
+        str(tmp_path / 'submissions.json'), dry_run=False, config={'compact_records': 1000}
+    ).unwrap()
+    context_cache = ContextCache(
+        JsonStore(str(tmp_path / 'context_cache.json')).unwrap(),
+        {'ttl_hours': 72, 'stagger': 0},
+    )
+    journal = OperationJournal(
+        str(tmp_path / 'operations.journal'),
+        {'fsync_every': 10, 'fsync_interval_s': 5},
+        dry_run=False,
+    )
+    applicator = Applicator(
+        api,
+        submissions,
+        context_cache,
+        journal,
+        {'concurrency': 4, 'greylist': {'max_attempts': 3, 'timeout': 24}},
+    )
+    group_info = {
+        'group-1': {'name': 'group-1', 'throttle': {'mode': 'day', 'count': 1, 'remaining': 1}},
+        'group-2': {'name': 'group-2', 'throttle': {'mode': 'none'}},
+    }
+    result = applicator(
+        operations,
+        {'Set': 'set-1'},
+        {},
+        group_info,
+        deadline or Deadline(60),
+    )
+    return result, submissions, journal, group_info
+
+
+def test_applies_operations_and_records_results(tmp_path):
+    api = FakeApi()
+    photo_1 = {'id': 'photo-1', 'title': 'Photo 1'}
+    photo_2 = {'id': 'photo-2', 'title': 'Photo 2'}
+    operations = [
+        op_for('addPhotoToGroup', photo_1, 'group-1'),
+        op_for('addPhotoToGroup', photo_2, 'group-2'),
+        op_for('publishPhoto', photo_1),
+        op_for('addPhotoToSet', photo_1, 'Set'),
+    ]
+    result, submissions, journal, _ = run_applicator(tmp_path, api, operations)
+    assert result.result
+    assert result.greylist == {}
+    assert sorted(api.calls) == [
+        ('addPhotoToGroup', 'photo-1', 'group-1'),
+        ('addPhotoToGroup', 'photo-2', 'group-2'),
+        ('addPhotoToSet', 'photo-1', 'set-1'),
+        ('publishPhoto', 'photo-1'),
+    ]
+    assert submissions.isPhotoInGroup(photo_1, 'group-1')
+    assert submissions.isPhotoInGroup(photo_2, 'group-2')
+    assert journal.interrupted() is None
+
+
+def test_greylists_failed_operation_and_records_photo_limit(tmp_path):
+    api = FakeApi(
+        {('addPhotoToGroup', 'photo-1', 'group-1'): {'code': 5, 'message': 'limit'}}
+    )
+    photo_1 = {'id': 'photo-1', 'title': 'Photo 1'}
+    operations = [op_for('addPhotoToGroup', photo_1, 'group-1')]
+    result, submissions, _, group_info = run_applicator(tmp_path, api, operations)
+    assert not result.result
+    assert len(result.greylist) == 1
+    assert not submissions.isPhotoInGroup(photo_1, 'group-1')
+    assert GroupInfo(group_info).hasPhotoLimit('group-1')
+
+
+def test_leaves_operations_when_deadline_expired(tmp_path):
+    api = FakeApi()
+    photo_1 = {'id': 'photo-1', 'title': 'Photo 1'}
+    operations = [op_for('publishPhoto', photo_1)]
+    result, _, _, _ = run_applicator(tmp_path, api, operations, Deadline(0))
+    assert not result.result
+    assert api.calls == []
+
+
+def test_same_photo_dates_are_set_before_publish(tmp_path):
+    api = FakeApi()
+    photo_1 = {'id': 'photo-1', 'title': 'Photo 1'}
+    operations = [
+        op_for('addPhotoToGroup', photo_1, 'group-2'),
+        op_for('updatePhotoDates', photo_1),
+        op_for('publishPhoto', photo_1),
+    ]
+    run_applicator(tmp_path, api, operations)
+    assert api.calls == [
+        ('updatePhotoDates', 'photo-1'),
+        ('publishPhoto', 'photo-1'),
+        ('addPhotoToGroup', 'photo-1', 'group-2'),
+    ]
@@ -0,0 +1,55 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+from drflickr.cli import automation
+from drflickr.api import NetworkError
+from drresult import Ok, Err
+
+
+class FakeRunner:
+    def __init__(self, results, exit_flag, closed):
+        self.results = results
+        self.exit_flag = exit_flag
+        self.closed = closed
+
+    def __call__(self):
+        result = self.results.pop(0)
+        if not self.results:
+            self.exit_flag['flag'] = True
+        return result
+
+    def close(self):
+        self.closed.append(self)
+
+
+def run_loop(monkeypatch, results, keep_runner):
+    exit_flag = {'flag': False}
+    loaded = []
+    closed = []
+
+    def load(*args):
+        loaded.append(FakeRunner(results, exit_flag, closed))
+        return Ok(loaded[-1])
+
+    monkeypatch.setattr(automation, 'load', load)
+    automation.loop(False, 0, exit_flag, keep_runner, True, False, 'config', 'run', 'creds')
+    return loaded, closed
+
+
+def test_keeps_runner_between_successful_cycles(monkeypatch):
+    loaded, closed = run_loop(monkeypatch, [Ok(True), Ok(True), Ok(False)], True)
+    assert len(loaded) == 1
+    assert closed == loaded
+
+
+def test_discards_runner_after_failed_cycle(monkeypatch):
+    results = [Ok(True), Err(NetworkError('reset')), Ok(True), Ok(True)]
+    loaded, closed = run_loop(monkeypatch, results, True)
+    assert len(loaded) == 2
+    assert closed == loaded
+
+
+def test_reloads_runner_every_cycle_without_keep_runner(monkeypatch):
+    loaded, closed = run_loop(monkeypatch, [Ok(True), Ok(True), Ok(True)], False)
+    assert len(loaded) == 3
+    assert closed == loaded
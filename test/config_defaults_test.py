@@ -0,0 +1,32 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+from drflickr.config_defaults import config_defaults, withDefaults
+
+import os
+import yaml
+
+config_example = os.path.join(
+    os.path.dirname(__file__), '..', 'config.example', 'config.yaml'
+)
+
+
+def test_example_config_lists_every_default():
+    with open(config_example) as f:
+        example = yaml.safe_load(f)
+    assert withDefaults(example) == example
+
+
+def test_config_without_new_sections_gets_defaults():
+    config = withDefaults({'applicator': {'greylist': {'max_attempts': 14, 'timeout': 24}}})
+    assert config['applicator']['greylist'] == {'max_attempts': 14, 'timeout': 24}
+    assert config['applicator']['concurrency'] == 4
+    assert config['api'] == config_defaults['api']
+    assert config['runner']['cycle_budget_minutes'] == 60
+
+
+def test_user_values_override_nested_defaults():
+    config = withDefaults({'api': {'rate_limit': {'read': {'rate': 0.5}}}})
+    assert config['api']['rate_limit']['read'] == {'rate': 0.5, 'burst': 5}
+    assert config['api']['rate_limit']['write'] == {'rate': 0.2, 'burst': 1}
+    assert config_defaults['api']['rate_limit']['read']['rate'] == 0.75
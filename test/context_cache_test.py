@@ -0,0 +1,52 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+from drflickr.context_cache import ContextCache
+
+import time
+
+config = {'ttl_hours': 10, 'stagger': 0.5}
+
+
+class StoreDummy:
+    def __init__(self, content):
+        self.content = content
+
+
+def test_miss_then_hit():
+    cache = ContextCache(StoreDummy({}), config)
+    assert cache.get('photo-1') is None
+    cache.put('photo-1', ['group-1'])
+    assert cache.get('photo-1') == ['group-1']
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_expiry_is_staggered_within_ttl():
+    cache = ContextCache(StoreDummy({}), config)
+    now = time.time()
+    for i in range(100):
+        cache.put(f'photo-{i}', [])
+    expires = [entry['expires'] for entry in cache.store.content['photos'].values()]
+    assert min(expires) >= now + 5 * 60 * 60
+    assert max(expires) <= time.time() + 10 * 60 * 60
+    assert len(set(expires)) > 1
+
+
+def test_expired_entry_is_a_miss():
+    store = StoreDummy({'photos': {'photo-1': {'groups': [], 'expires': time.time() - 1}}})
+    cache = ContextCache(store, config)
+    assert cache.get('photo-1') is None
+    assert cache.misses == 1
+
+
+def test_invalidate_and_retain():
+    cache = ContextCache(StoreDummy({}), config)
+    cache.put('photo-1', ['group-1'])
+    cache.put('photo-2', ['group-2'])
+    cache.put('photo-3', ['group-3'])
+    cache.invalidate('photo-1')
+    cache.retain(['photo-1', 'photo-2'])
+    assert cache.get('photo-1') is None
+    assert cache.get('photo-2') == ['group-2']
+    assert cache.get('photo-3') is None
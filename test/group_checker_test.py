@@ -118,6 +118,7 @@ greylist_config_disabled = {
 
 group_checker_config = {
     'stats': {'required_tag': 'stat-groups', 'delay': 0},
+    'max_pools': 60,
     'selector': {
         'initial_burst': {
             'num_photos': 1,
@@ -200,6 +201,52 @@ def test_does_add_legit_tag_groups_in_initial_burst():
     )
 
 
+def test_does_not_add_tag_groups_when_at_pool_cap():
+    now = time.time()
+    photo = {
+        'id': 'photo-1',
+        'title': 'Photo 1',
+        'date_posted': now - 1 * 24 * 60 * 60,
+        'date_taken': now - 1 * 24 * 60 * 60,
+        'faves': 0,
+        'views': 0,
+        'groups': [],
+        'tags': ['streetphotography'],
+        'sets': {},
+        'is_public': True,
+    }
+    greylist = Greylist({}, greylist_config)
+    group_checker = GroupChecker(
+        tag_groups, view_groups, favorites_groups, group_checker_config
+    )
+    group_checker(photo, greylist, GroupInfo(group_info), blacklist, 60)
+    assert photo['groups'] == []
+
+
+def test_does_add_tag_groups_only_up_to_pool_cap():
+    now = time.time()
+    photo = {
+        'id': 'photo-1',
+        'title': 'Photo 1',
+        'date_posted': now - 1 * 24 * 60 * 60,
+        'date_taken': now - 1 * 24 * 60 * 60,
+        'faves': 0,
+        'views': 0,
+        'groups': [],
+        'tags': ['streetphotography'],
+        'sets': {},
+        'is_public': True,
+    }
+    greylist = Greylist({}, greylist_config)
+    group_checker_config_ = json.loads(json.dumps(group_checker_config))
+    group_checker_config_['selector']['initial_burst']['num_photos'] = 2
+    group_checker = GroupChecker(
+        tag_groups, view_groups, favorites_groups, group_checker_config_
+    )
+    group_checker(photo, greylist, GroupInfo(group_info), blacklist, 59)
+    assert len(photo['groups']) == 1
+
+
 def test_does_add_legit_tag_groups_after_initial_burst():
     now = time.time()
     photo = {
@@ -0,0 +1,62 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+from drflickr.group_info import GroupInfo
+
+import time
+
+
+def make_group_info(throttle, **kwargs):
+    return GroupInfo(
+        {'g1': {'name': 'g1', 'ispoolmoderated': False, 'throttle': throttle, **kwargs}}
+    )
+
+
+def test_no_limit_without_remaining():
+    assert not make_group_info({}).hasPhotoLimit('g1')
+    assert not make_group_info({'mode': 'none', 'remaining': 0}).hasPhotoLimit('g1')
+
+
+def test_limit_until_predicted_reset():
+    group_info = make_group_info(
+        {'mode': 'day', 'count': 3, 'remaining': 0}, throttle_reset=time.time() + 60
+    )
+    assert group_info.hasPhotoLimit('g1')
+    group_info.group_info['g1']['throttle_reset'] = time.time() - 60
+    assert not group_info.hasPhotoLimit('g1')
+    assert group_info.getRemaining('g1') == 3
+
+
+def test_record_photo_limit_predicts_reset_from_mode():
+    group_info = make_group_info({'mode': 'week', 'count': 1, 'remaining': 1})
+    group_info.recordPhotoLimit('g1')
+    assert group_info.hasPhotoLimit('g1')
+    reset = group_info.group_info['g1']['throttle_reset']
+    assert reset > time.time() + 6 * 24 * 60 * 60
+
+
+def test_ever_mode_never_resets():
+    group_info = make_group_info({'mode': 'ever', 'count': 5, 'remaining': 1})
+    group_info.recordPhotoLimit('g1')
+    assert group_info.group_info['g1']['throttle_reset'] is None
+    assert group_info.hasPhotoLimit('g1')
+
+
+def test_reduce_remaining_after_reset_starts_new_window():
+    group_info = make_group_info(
+        {'mode': 'day', 'count': 2, 'remaining': 0}, throttle_reset=time.time() - 60
+    )
+    group_info.reduceRemaining('g1')
+    assert group_info.getRemaining('g1') == 1
+    assert 'throttle_reset' not in group_info.group_info['g1']
+    group_info.reduceRemaining('g1')
+    assert group_info.hasPhotoLimit('g1')
+
+
+def test_unknown_group_has_no_limit():
+    group_info = make_group_info({})
+    assert group_info.getName('g2') == 'g2'
+    assert group_info.getRemaining('g2') is None
+    assert not group_info.hasPhotoLimit('g2')
+    group_info.reduceRemaining('g2')
+    assert 'g2' not in group_info.group_info
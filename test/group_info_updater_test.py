@@ -0,0 +1,107 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+from drflickr.group_info_updater import GroupInfoUpdater
+from drresult import Ok
+
+import time
+
+config = {'ttl_hours': {'static': 168, 'throttle': 24, 'throttle_moderated': 1}}
+
+
+class ApiDummy:
+    def __init__(self, user_groups={}):
+        self.requested = []
+        self.user_groups = user_groups
+
+    def getUserGroups(self):
+        return Ok(self.user_groups)
+
+    def getGroupInfo(self, group_id):
+        self.requested.append(group_id)
+        return Ok({'name': f'name-{group_id}', 'ispoolmoderated': False, 'throttle': {}})
+
+    def collectConcurrently(self, function, args_list):
+        return [function(*args) for args in args_list]
+
+
+def make_group(age_hours, throttle_age_hours, ispoolmoderated=False):
+    now = time.time()
+    return {
+        'name': 'group',
+        'ispoolmoderated': ispoolmoderated,
+        'last_update': now - age_hours * 60 * 60,
+        'throttle_update': now - throttle_age_hours * 60 * 60,
+    }
+
+
+def test_fetches_new_groups():
+    api = ApiDummy()
+    result = GroupInfoUpdater(api, config)({}, ['g1', 'g2'], [], [])
+    assert sorted(api.requested) == ['g1', 'g2']
+    assert result['g1']['name'] == 'name-g1'
+    assert 'throttle_update' in result['g1']
+
+
+def test_throttle_only_refreshed_for_candidates():
+    api = ApiDummy()
+    group_info = {'g1': make_group(2, 30), 'g2': make_group(2, 30)}
+    GroupInfoUpdater(api, config)(group_info, ['g1', 'g2'], ['g1'], [])
+    assert api.requested == ['g1']
+
+
+def test_moderated_candidates_use_shorter_ttl():
+    api = ApiDummy()
+    group_info = {
+        'g1': make_group(2, 2, ispoolmoderated=True),
+        'g2': make_group(2, 2, ispoolmoderated=False),
+    }
+    GroupInfoUpdater(api, config)(group_info, ['g1', 'g2'], ['g1', 'g2'], [])
+    assert api.requested == ['g1']
+
+
+def test_static_info_expires_for_all_groups():
+    api = ApiDummy()
+    group_info = {'g1': make_group(200, 2), 'g2': make_group(2, 2)}
+    GroupInfoUpdater(api, config)(group_info, ['g1', 'g2'], [], [])
+    assert api.requested == ['g1']
+
+
+def test_evicts_unconfigured_groups_without_submissions():
+    api = ApiDummy()
+    group_info = {'g1': make_group(2, 2), 'g2': make_group(2, 2), 'g3': make_group(2, 2)}
+    result = GroupInfoUpdater(api, config)(group_info, ['g1'], [], ['g2'])
+    assert sorted(result.keys()) == ['g1', 'g2']
+    assert api.requested == []
+
+
+def test_bootstraps_static_info_from_group_listing():
+    api = ApiDummy(
+        {
+            'g1': {
+                'name': 'listed-g1',
+                'members': 10,
+                'ispoolmoderated': False,
+                'invitation_only': False,
+            }
+        }
+    )
+    result = GroupInfoUpdater(api, config)({}, ['g1', 'g2'], [], [])
+    assert api.requested == ['g2']
+    assert result['g1']['name'] == 'listed-g1'
+    assert result['g2']['name'] == 'name-g2'
+
+
+def test_bootstrapped_candidates_still_fetch_throttle():
+    api = ApiDummy(
+        {
+            'g1': {
+                'name': 'listed-g1',
+                'members': 10,
+                'ispoolmoderated': False,
+                'invitation_only': False,
+            }
+        }
+    )
+    GroupInfoUpdater(api, config)({}, ['g1'], ['g1'], [])
+    assert api.requested == ['g1']
@@ -108,6 +108,7 @@ config_logic = {
     'managed_album': 'All',
     'group_checker': {
         'stats': {'required_tag': 'stats', 'delay': 0},
+        'max_pools': 60,
         'selector': {
             'initial_burst': {
                 'num_photos': 1,
@@ -0,0 +1,57 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+from drflickr.metric_series import MetricSeries
+
+import statistics
+import pytest
+
+
+def make_series(values, period=28, retention=56):
+    series = MetricSeries(MetricSeries.initialState(period, retention))
+    for index, value in enumerate(values):
+        series.push(f'day-{index}', value)
+    return series
+
+
+def test_running_mean_and_variance():
+    values = [3, 7, 7, 19, 4, 11, 2, 8]
+    series = make_series(values)
+    assert series.state['mean'] == pytest.approx(statistics.mean(values))
+    assert series.variance() == pytest.approx(statistics.pvariance(values))
+
+
+def test_ema_of_constant_series():
+    series = make_series([100] * 40)
+    assert series.emaPrevious() == pytest.approx(100)
+    assert series.last() == 100
+
+
+def test_outlier_does_not_move_ema():
+    series = make_series([100, 102, 98, 101, 99, 100, 101, 99, 100, 102], period=7)
+    ema = series.state['ema']
+    series.push('spike', 100000)
+    assert series.state['ema'] == ema
+    assert series.emaPrevious() == ema
+    assert series.last() == 100000
+
+
+def test_no_outliers_before_a_full_period():
+    series = make_series([100, 100], period=7)
+    assert not series.isOutlier(101)
+    series.push('day-2', 101)
+    assert series.state['ema'] > 100
+
+
+def test_retention_is_bounded():
+    series = make_series(range(100), retention=10)
+    assert len(series.state['values']) == 10
+    assert series.lastDate() == 'day-99'
+    assert series.state['count'] == 100
+
+
+def test_empty_series():
+    series = make_series([])
+    assert series.last() is None
+    assert series.lastDate() is None
+    assert series.emaPrevious() is None
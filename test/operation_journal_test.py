@@ -0,0 +1,54 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+from drflickr.operation_journal import OperationJournal
+
+config = {'fsync_every': 2, 'fsync_interval_s': 60}
+
+operations = [
+    {'method': 'publishPhoto', 'params': [{'id': 'photo-1'}]},
+    {'method': 'addPhotoToGroup', 'params': [{'id': 'photo-1'}, 'group-1']},
+    {'method': 'addPhotoToGroup', 'params': [{'id': 'photo-2'}, 'group-1']},
+]
+
+
+def test_completed_plan_is_not_interrupted(tmp_path):
+    journal = OperationJournal(tmp_path / 'operations.journal', config, dry_run=False)
+    assert journal.interrupted() is None
+    journal.begin(operations, {'Set': 'set-1'})
+    for index in range(len(operations)):
+        journal.done(index, None)
+    journal.end()
+    assert journal.interrupted() is None
+
+
+def test_interrupted_plan_resumes_remaining_operations(tmp_path):
+    filename = tmp_path / 'operations.journal'
+    journal = OperationJournal(filename, config, dry_run=False)
+    journal.begin(operations, {'Set': 'set-1'})
+    journal.done(1, 'limit hit')
+    journal.done(0, None)
+    journal.file.close()
+    with open(filename, 'a') as f:
+        f.write('{"type": "do')
+
+    plan = OperationJournal(filename, config, dry_run=False).interrupted()
+    assert plan.operations == [operations[2]]
+    assert plan.photosets == {'Set': 'set-1'}
+    assert plan.completed == [(operations[1], 'limit hit'), (operations[0], None)]
+
+
+def test_interrupted_resume_is_not_resumed_again(tmp_path):
+    journal = OperationJournal(tmp_path / 'operations.journal', config, dry_run=False)
+    journal.begin(operations, {}, resumed=True)
+    journal.file.close()
+    assert journal.interrupted() is None
+
+
+def test_dry_run_writes_nothing(tmp_path):
+    filename = tmp_path / 'operations.journal'
+    journal = OperationJournal(filename, config, dry_run=True)
+    journal.begin(operations, {})
+    journal.done(0, None)
+    journal.end()
+    assert not filename.exists()
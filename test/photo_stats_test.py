@@ -0,0 +1,69 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+from drflickr.photo_stats import PhotoStats
+from drresult import Ok
+
+from datetime import date, timedelta
+
+
+class FakeApi:
+    def __init__(self):
+        self.days = []
+
+    def getPopularPhotos(self, day):
+        self.days.append(day)
+        return Ok({'photo-1': {'views': 5, 'faves': 1}})
+
+
+def make_photo_stats(tmp_path, api=None, retention_days=3):
+    return PhotoStats(
+        api,
+        str(tmp_path / 'photo_stats.json'),
+        {'enabled': True, 'retention_days': retention_days},
+    ).load().unwrap()
+
+
+def test_append_aligns_columns_for_new_and_missing_photos(tmp_path):
+    photo_stats = make_photo_stats(tmp_path)
+    photo_stats.append('2024-01-01', {'photo-1': {'views': 3, 'faves': 1}})
+    photo_stats.append('2024-01-02', {'photo-2': {'views': 7, 'faves': 0}})
+    columns = photo_stats.stats.content['columns']
+    assert photo_stats.stats.content['dates'] == ['2024-01-01', '2024-01-02']
+    assert columns['views'] == {'photo-1': [3, 0], 'photo-2': [0, 7]}
+    assert columns['faves'] == {'photo-1': [1, 0], 'photo-2': [0, 0]}
+    assert photo_stats.trend('photo-2', 'views', 2) == 7
+
+
+def test_append_prunes_to_retention(tmp_path):
+    photo_stats = make_photo_stats(tmp_path, retention_days=2)
+    photo_stats.append('2024-01-01', {'photo-1': {'views': 3, 'faves': 1}})
+    photo_stats.append('2024-01-02', {'photo-2': {'views': 7, 'faves': 2}})
+    photo_stats.append('2024-01-03', {'photo-2': {'views': 1, 'faves': 0}})
+    columns = photo_stats.stats.content['columns']
+    assert photo_stats.stats.content['dates'] == ['2024-01-02', '2024-01-03']
+    assert columns['views'] == {'photo-2': [7, 1]}
+    assert columns['faves'] == {'photo-2': [2, 0]}
+
+
+def test_update_fetches_only_days_not_stored(tmp_path):
+    api = FakeApi()
+    photo_stats = make_photo_stats(tmp_path, api)
+    yesterday = date.today() - timedelta(days=1)
+    photo_stats.append(
+        (yesterday - timedelta(days=1)).strftime('%Y-%m-%d'),
+        {'photo-1': {'views': 2, 'faves': 0}},
+    )
+    assert photo_stats.update().is_ok()
+    assert api.days == [yesterday]
+
+    assert make_photo_stats(tmp_path, api).update().is_ok()
+    assert api.days == [yesterday]
+
+
+def test_update_does_nothing_when_disabled(tmp_path):
+    api = FakeApi()
+    photo_stats = make_photo_stats(tmp_path, api)
+    photo_stats.config['enabled'] = False
+    assert photo_stats.update().is_ok()
+    assert api.days == []
@@ -0,0 +1,29 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+from drflickr.rate_limiter import TokenBucket
+
+import time
+
+
+def test_burst_is_available_immediately():
+    bucket = TokenBucket(rate=1, burst=5)
+    start = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - start < 0.5
+
+
+def test_waits_for_refill_when_empty():
+    bucket = TokenBucket(rate=20, burst=1)
+    start = time.monotonic()
+    for _ in range(3):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.09
+
+
+def test_tokens_do_not_exceed_burst():
+    bucket = TokenBucket(rate=1000, burst=2)
+    time.sleep(0.05)
+    bucket.refill()
+    assert bucket.tokens == 2
@@ -0,0 +1,101 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+from drflickr.retriever import Retriever
+from drflickr.context_cache import ContextCache
+from drflickr.submissions import Submissions
+from drflickr.deadline import DeadlineExceeded
+from drresult import Ok, Err
+from mrjsonstore import JsonStore
+
+import time
+
+config = {
+    'album_scoped': True,
+    'full_sync_hours': 24,
+    'photoset_concurrency': 2,
+    'context_cache': {'ttl_hours': 72, 'stagger': 0},
+}
+
+
+class FakeApi:
+    def __init__(self, failing=[]):
+        self.photoset_calls = []
+        self.group_calls = []
+        self.failing = set(failing)
+
+    def getPhotos(self, sort):
+        return Ok(
+            {
+                id: {
+                    'id': id,
+                    'title': id,
+                    'tags': [],
+                    'views': 0,
+                    'faves': 0,
+                    'date_posted': 0,
+                    'date_taken': 0,
+                    'is_public': True,
+                    'last_update': 1,
+                }
+                for id in ['photo-1', 'photo-2']
+            }
+        )
+
+    def getPhotosets(self):
+        return Ok({'All': {'id': 'set-1', 'count': 2, 'date_update': 1}})
+
+    def getPhotoset(self, photoset_id):
+        self.photoset_calls.append(photoset_id)
+        return Ok(['photo-1', 'photo-2'])
+
+    def getPhotoGroups(self, photo_id):
+        self.group_calls[-1].append(photo_id)
+        if photo_id in self.failing:
+            return Err(DeadlineExceeded())
+        return Ok(['group-1'])
+
+    def collectConcurrently(self, function, args_list):
+        self.group_calls.append([])
+        return [function(*args) for args in args_list]
+
+
+def make_retriever(tmp_path, api):
+    submissions = Submissions(
+        str(tmp_path / 'submissions.json'), dry_run=False, config={'compact_records': 1000}
+    ).unwrap()
+    snapshot = JsonStore(str(tmp_path / 'snapshot.json')).unwrap()
+    context_cache = ContextCache(
+        JsonStore(str(tmp_path / 'context_cache.json')).unwrap(),
+        config['context_cache'],
+    )
+    return Retriever(api, submissions, snapshot, context_cache, config, 'All'), snapshot
+
+
+def test_full_sync_refetches_photosets_but_keeps_cached_contexts(tmp_path):
+    api = FakeApi()
+    retriever, snapshot = make_retriever(tmp_path, api)
+    result = retriever({}).unwrap()
+    assert result.pool_counts == {'photo-1': 1, 'photo-2': 1}
+    assert api.photoset_calls == ['set-1']
+    assert api.group_calls == [['photo-1', 'photo-2']]
+
+    with snapshot.transaction():
+        snapshot.content['last_full_sync'] = time.time() - 25 * 60 * 60
+    retriever({}).unwrap()
+    assert api.photoset_calls == ['set-1', 'set-1']
+    assert api.group_calls == [['photo-1', 'photo-2'], []]
+    assert snapshot.content['last_full_sync'] > time.time() - 60
+
+
+def test_keeps_contexts_fetched_before_a_failure(tmp_path):
+    api = FakeApi(failing=['photo-2'])
+    retriever, snapshot = make_retriever(tmp_path, api)
+    result = retriever({})
+    assert isinstance(result.unwrap_err(), DeadlineExceeded)
+    assert list(snapshot.content['photos']) == ['photo-1']
+
+    api.failing = set()
+    result = retriever({}).unwrap()
+    assert api.group_calls == [['photo-1', 'photo-2'], ['photo-2']]
+    assert result.pool_counts == {'photo-1': 1, 'photo-2': 1}
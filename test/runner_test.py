@@ -0,0 +1,119 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+from drflickr.runner import Runner
+from drflickr.api import Api
+from drflickr.operation_journal import OperationJournal
+from drresult import Ok
+
+import os
+import shutil
+import time
+import yaml
+
+config_example = os.path.join(os.path.dirname(__file__), '..', 'config.example')
+
+
+def writeYaml(filename, content):
+    with open(filename, 'w') as f:
+        f.write(yaml.safe_dump(content))
+
+
+def make_runner(tmp_path, monkeypatch):
+    responses = {
+        'test.login': {'stat': 'ok'},
+        'stats.getTotalViews': {'stat': 'ok', 'stats': {'total': {'views': '10'}}},
+    }
+
+    def call(self, method, params={}, use_user_id=True):
+        return Ok(responses[method])
+
+    monkeypatch.setattr(Api, 'call', call)
+    config_path = tmp_path / 'config'
+    creds_path = tmp_path / 'creds'
+    shutil.copytree(config_example, config_path)
+    os.makedirs(creds_path)
+    writeYaml(creds_path / 'api-key.yaml', {'key': 'key', 'secret': 'secret'})
+    writeYaml(
+        creds_path / 'access-token.yaml',
+        {'oauth_token': 'token', 'oauth_token_secret': 'secret', 'user_nsid': 'user'},
+    )
+    return Runner(str(config_path), str(tmp_path / 'run'), str(creds_path), dry_run=False)
+
+
+def test_load_with_example_config(tmp_path, monkeypatch):
+    runner = make_runner(tmp_path, monkeypatch)
+    result = runner.load()
+    runner.close()
+    assert result.is_ok()
+    assert isinstance(runner.operation_journal, OperationJournal)
+    assert runner.applicator.journal is runner.operation_journal
+    assert runner.submissions.isEmpty()
+
+
+def test_load_with_config_from_before_new_sections(tmp_path, monkeypatch):
+    runner = make_runner(tmp_path, monkeypatch)
+    with open(runner.config_filename) as f:
+        config = yaml.safe_load(f)
+    for section in ['api', 'retriever', 'runner', 'submissions', 'photo_stats', 'group_info']:
+        del config[section]
+    del config['applicator']['concurrency']
+    del config['applicator']['journal']
+    del config['logic']['group_checker']['max_pools']
+    writeYaml(runner.config_filename, config)
+    result = runner.load()
+    runner.close()
+    assert result.is_ok()
+    assert runner.config['cycle_budget_minutes'] == 60
+
+
+def test_unchanged_config_is_not_reread(tmp_path, monkeypatch):
+    runner = make_runner(tmp_path, monkeypatch)
+    runner.load().unwrap()
+    logic, retriever, applicator = runner.logic, runner.retriever, runner.applicator
+    reads = []
+    monkeypatch.setattr(
+        'drflickr.runner.readConfig', lambda filename: reads.append(filename)
+    )
+    assert runner.reloadConfig().is_ok()
+    runner.close()
+    assert reads == []
+    assert runner.logic is logic
+    assert runner.retriever is retriever
+    assert runner.applicator is applicator
+
+
+def test_changed_config_rebuilds_components(tmp_path, monkeypatch):
+    runner = make_runner(tmp_path, monkeypatch)
+    runner.load().unwrap()
+    logic, retriever, applicator = runner.logic, runner.retriever, runner.applicator
+    with open(runner.tag_groups_filename) as f:
+        tag_groups = yaml.safe_load(f)
+    removed = next(iter(tag_groups))
+    del tag_groups[removed]
+    writeYaml(runner.tag_groups_filename, tag_groups)
+    mtime = os.stat(runner.config_filename).st_mtime
+    os.utime(runner.tag_groups_filename, (mtime + 10, mtime + 10))
+    assert runner.reloadConfig().is_ok()
+    runner.close()
+    assert runner.logic is not logic
+    assert runner.retriever is not retriever
+    assert runner.applicator is not applicator
+    assert removed not in runner.tag_groups
+    assert removed not in runner.all_groups
+
+
+def test_keeps_info_on_unconfigured_groups_photos_are_expected_in(tmp_path, monkeypatch):
+    runner = make_runner(tmp_path, monkeypatch)
+    runner.load().unwrap()
+    runner.all_groups = []
+    now = time.time()
+    group = {'name': 'group', 'last_update': now, 'throttle_update': now}
+    with runner.state_store.transaction() as t:
+        runner.state_store.content['group_info'] = {'g1': dict(group), 'g2': dict(group)}
+        runner.state_store.content['photos_expected'] = {'p1': {'groups': ['g1']}}
+    t.result.unwrap()
+    result = runner.updateGroupInfo([])
+    runner.close()
+    assert result.is_ok()
+    assert list(runner.state_store.content['group_info'].keys()) == ['g1']
@@ -0,0 +1,50 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+from drflickr.stats import Stats
+from drflickr.api import NetworkError
+from drresult import Ok, Err
+from mrjsonstore import JsonStore
+
+from datetime import date, timedelta
+
+
+class FakeApi:
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+        self.days = []
+
+    def getTotalViews(self, day):
+        if self.fail_after is not None and len(self.days) >= self.fail_after:
+            return Err(NetworkError('connection reset'))
+        self.days.append(day)
+        return Ok(100)
+
+    def runConcurrently(self, function, args_list):
+        results = []
+        for args in args_list:
+            result = function(*args)
+            if result.is_err():
+                return result
+            results.append(result.unwrap())
+        return Ok(results)
+
+
+def test_backfill_resumes_after_last_committed_chunk(tmp_path):
+    filename = str(tmp_path / 'stats.json')
+    stats = Stats(FakeApi(fail_after=10), filename)
+    stats.stats = JsonStore(filename).unwrap()
+    stats.stats.content.setdefault('series', {})
+    assert stats.update().is_err()
+
+    committed = JsonStore(filename).unwrap().content
+    assert committed['series']['views.total']['count'] == Stats.CHUNK_SIZE
+
+    api = FakeApi()
+    stats = Stats(api, filename).load().unwrap()
+    yesterday = date.today() - timedelta(days=1)
+    first_missing = yesterday - timedelta(days=stats.period * 2 - Stats.CHUNK_SIZE - 1)
+    assert api.days[0] == first_missing
+    assert api.days[-1] == yesterday
+    assert len(api.days) == stats.period * 2 - Stats.CHUNK_SIZE
+    assert stats.series('views.total').lastDate() == yesterday.strftime('%Y-%m-%d')
@@ -0,0 +1,58 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+from drflickr.submissions import Submissions
+
+import os
+
+photo_1 = {'id': 'photo-1'}
+photo_2 = {'id': 'photo-2'}
+
+
+def load(tmp_path, compact_records=1000):
+    return Submissions(
+        str(tmp_path / 'submissions.json'),
+        dry_run=False,
+        config={'compact_records': compact_records},
+    ).unwrap()
+
+
+def test_changes_survive_reload_from_journal(tmp_path):
+    submissions = load(tmp_path)
+    assert submissions.add(photo_1, 'group-1').is_ok()
+    assert submissions.add(photo_1, 'group-2').is_ok()
+    assert submissions.add(photo_2, 'group-1').is_ok()
+    assert submissions.remove(photo_1, 'group-1').is_ok()
+    submissions.close()
+    assert not os.path.exists(tmp_path / 'submissions.json')
+
+    submissions = load(tmp_path)
+    assert submissions.getGroups(photo_1) == ['group-2']
+    assert submissions.getAllGroups() == {'group-1', 'group-2'}
+
+
+def test_compacts_journal_into_snapshot(tmp_path):
+    submissions = load(tmp_path, compact_records=2)
+    submissions.add(photo_1, 'group-1')
+    submissions.add(photo_2, 'group-1')
+    submissions.add(photo_2, 'group-2')
+    submissions.close()
+    assert os.path.exists(tmp_path / 'submissions.json')
+    assert not os.path.exists(tmp_path / 'submissions.journal.1')
+    with open(tmp_path / 'submissions.journal') as f:
+        assert len(f.readlines()) == 1
+
+    submissions = load(tmp_path)
+    assert submissions.isPhotoInGroup(photo_1, 'group-1')
+    assert submissions.getGroups(photo_2) == ['group-1', 'group-2']
+
+
+def test_ignores_incomplete_journal_record(tmp_path):
+    submissions = load(tmp_path)
+    submissions.add(photo_1, 'group-1')
+    submissions.close()
+    with open(tmp_path / 'submissions.journal', 'a') as f:
+        f.write('{"op": "add", "pho')
+
+    submissions = load(tmp_path)
+    assert submissions.getAllGroups() == {'group-1'}
@@ -0,0 +1,63 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+from drflickr.task_graph import TaskGraph
+from drresult import Ok, Err
+
+import threading
+import time
+
+
+def test_passes_dependency_results():
+    graph = TaskGraph('test')
+    graph.add('a', lambda: Ok(1))
+    graph.add('b', lambda: Ok(2))
+    graph.add('c', lambda a, b: Ok(a + b), ['a', 'b'])
+    graph.add('d', lambda c: Ok(c * 10), ['c'])
+    result = graph()
+    assert result.is_ok()
+    assert result.unwrap() == {'a': 1, 'b': 2, 'c': 3, 'd': 30}
+
+
+def test_runs_independent_tasks_concurrently():
+    barrier = threading.Barrier(2, timeout=5)
+
+    def task():
+        barrier.wait()
+        return Ok(None)
+
+    graph = TaskGraph('test')
+    graph.add('a', task)
+    graph.add('b', task)
+    assert graph().is_ok()
+
+
+def test_stops_on_first_error():
+    called = []
+    graph = TaskGraph('test')
+    graph.add('a', lambda: Err(RuntimeError('a failed')))
+    graph.add('b', lambda a: called.append('b') or Ok(None), ['a'])
+    result = graph()
+    assert result.is_err()
+    assert str(result.unwrap_err()) == 'a failed'
+    assert called == []
+
+
+def test_starts_ready_tasks_by_priority():
+    started = []
+    graph = TaskGraph('test', max_workers=1)
+    graph.add('low', lambda: started.append('low') or Ok(None), priority=2)
+    graph.add('high', lambda: started.append('high') or Ok(None), priority=0)
+    graph.add('mid', lambda: started.append('mid') or Ok(None), priority=1)
+    assert graph().is_ok()
+    assert started == ['high', 'mid', 'low']
+
+
+def test_ready_dependent_overtakes_lower_priority():
+    started = []
+    graph = TaskGraph('test', max_workers=1)
+    graph.add('a', lambda: started.append('a') or Ok(None), priority=0)
+    graph.add('b', lambda: started.append('b') or Ok(None), priority=5)
+    graph.add('c', lambda a: started.append('c') or Ok(None), ['a'], priority=1)
+    assert graph().is_ok()
+    assert started == ['a', 'c', 'b']
@@ -0,0 +1,53 @@
+# Copyright 2024 Ole Kliemann
+# SPDX-License-Identifier: Apache-2.0
+
+from drflickr.rate_limiter import TokenBucket
+from drflickr.write_throttle import AdaptiveThrottle
+
+import pytest
+
+config = {
+    'min_rate': 0.1,
+    'max_rate': 1.0,
+    'increase': 0.05,
+    'decrease': 0.5,
+    'latency_s': 5,
+}
+
+
+def test_increases_additively_on_fast_success():
+    bucket = TokenBucket(rate=0.2, burst=1)
+    throttle = AdaptiveThrottle(bucket, config)
+    throttle.record(True, 0.5)
+    throttle.record(True, 0.5)
+    assert throttle.rate == pytest.approx(0.3)
+    assert bucket.rate == pytest.approx(0.3)
+
+
+def test_decreases_multiplicatively_on_failure_or_slow_call():
+    throttle = AdaptiveThrottle(TokenBucket(rate=0.8, burst=1), config)
+    throttle.record(False, 0.5)
+    assert throttle.rate == pytest.approx(0.4)
+    throttle.record(True, 10)
+    assert throttle.rate == pytest.approx(0.2)
+
+
+def test_stays_within_bounds():
+    throttle = AdaptiveThrottle(TokenBucket(rate=0.98, burst=1), config)
+    throttle.record(True, 0.5)
+    assert throttle.rate == 1.0
+    for _ in range(10):
+        throttle.record(False, 0.5)
+    assert throttle.rate == 0.1
+
+
+def test_restores_persisted_rate_clamped_to_bounds():
+    throttle = AdaptiveThrottle(TokenBucket(rate=0.2, burst=1), config)
+    throttle.restore({'rate': 0.6, 'bounds': {'min_rate': 0.1, 'max_rate': 1.0}})
+    assert throttle.rate == 0.6
+    throttle.restore({'rate': 5.0})
+    assert throttle.rate == 1.0
+    assert throttle.to_dict() == {
+        'rate': 1.0,
+        'bounds': {'min_rate': 0.1, 'max_rate': 1.0},
+    }